@@ -0,0 +1,89 @@
+"""перенести изображения из p_images в хранилище файлов
+
+Revision ID: 5e00268ddb12
+Revises: c801a7aeb3a6
+Create Date: 2026-10-18 10:12:41.503127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from app.storage.blob_store import blob_store, guess_mime_type
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e00268ddb12'
+down_revision: Union[str, None] = 'c801a7aeb3a6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Количество изображений, переносимых за один запрос.
+BATCH_SIZE = 100
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('p_images', sa.Column('sha256', sa.String(length=64), nullable=True))
+    op.add_column('p_images', sa.Column('size', sa.Integer(), nullable=True))
+    op.add_column('p_images', sa.Column('mime_type', sa.String(length=100), nullable=True))
+
+    # Перенести содержимое изображений в хранилище файлов пачками,
+    # чтобы не загружать в память всю таблицу.
+    connection = op.get_bind()
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.text("SELECT id, img FROM p_images WHERE id > :last_id ORDER BY id LIMIT :limit"),
+            {"last_id": last_id, "limit": BATCH_SIZE}
+        ).all()
+        if not rows:
+            break
+        for image_id, img in rows:
+            data = bytes(img)
+            connection.execute(
+                sa.text("UPDATE p_images SET sha256 = :sha256, size = :size, mime_type = :mime_type "
+                        "WHERE id = :id"),
+                {
+                    "id": image_id,
+                    "sha256": blob_store.add_sync(data),
+                    "size": len(data),
+                    "mime_type": guess_mime_type(data)
+                }
+            )
+        last_id = rows[-1][0]
+
+    op.alter_column('p_images', 'sha256', nullable=False)
+    op.alter_column('p_images', 'size', nullable=False)
+    op.alter_column('p_images', 'mime_type', nullable=False)
+    op.drop_column('p_images', 'img')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('p_images', sa.Column('img', postgresql.BYTEA(), nullable=True))
+
+    # Вернуть содержимое изображений из хранилища файлов в таблицу.
+    # Файлы из хранилища не удаляются.
+    connection = op.get_bind()
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.text("SELECT id, sha256 FROM p_images WHERE id > :last_id ORDER BY id LIMIT :limit"),
+            {"last_id": last_id, "limit": BATCH_SIZE}
+        ).all()
+        if not rows:
+            break
+        for image_id, sha256 in rows:
+            connection.execute(
+                sa.text("UPDATE p_images SET img = :img WHERE id = :id"),
+                {"id": image_id, "img": blob_store.get_sync(sha256)}
+            )
+        last_id = rows[-1][0]
+
+    op.alter_column('p_images', 'img', nullable=False)
+    op.drop_column('p_images', 'mime_type')
+    op.drop_column('p_images', 'size')
+    op.drop_column('p_images', 'sha256')
@@ -0,0 +1,96 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.endpoints.pereval import get_async_session, json_response
+from app.api.schemas.pereval import AreaSchema, AreaPerevalSchema, AREA_LIST_ADAPTER, AREA_PEREVAL_LIST_ADAPTER
+from app.core.areas import get_area_tree, has_area
+from app.db.repositories.pereval import DatabaseManager
+
+
+router = APIRouter()
+
+
+# endpoint, выводящий дерево областей перевалов списком: каждая область после своего родителя.
+# Дерево берётся из памяти процесса, из базы данных загружается только количество перевалов по областям.
+@router.get("/areas", response_model=List[AreaSchema])
+async def get_areas(session: AsyncSession = Depends(get_async_session)):
+    # Создать экземпляр класса для работы с базой данной.
+    db_manager = DatabaseManager()
+    try:
+        tree = await get_area_tree(session)
+        counts = await db_manager.count_perevals_by_area(session)
+    # Обработать ошибки вызванные SQLAlchemy.
+    except SQLAlchemyError as e:
+        return JSONResponse(
+            status_code=500,
+            content={
+                "status": 500,
+                "message": f"Ошибка подключения к базе данных: {e}"
+            }
+        )
+    totals = tree.subtree_totals(counts)
+    items = AREA_LIST_ADAPTER.validate_python([
+        {
+            "id": area_id,
+            "id_parent": tree.parents.get(area_id),
+            "title": tree.titles[area_id],
+            "depth": depth,
+            "perevals_count": counts.get(area_id, 0),
+            "perevals_total": totals[area_id],
+        }
+        for area_id, depth in tree.walk()
+    ])
+    return json_response(AREA_LIST_ADAPTER.dump_json(items))
+
+
+# endpoint, выводящий перевалы области и всех её подобластей в порядке "id".
+# Если есть следующая страница, "id" последнего перевала передаётся в заголовке "X-Next-Cursor".
+@router.get("/areas/{area_id}/perevals", response_model=List[AreaPerevalSchema])
+async def get_area_perevals(
+        area_id: int,
+        limit: int = Query(100, ge=1, le=1000, description="Количество перевалов на странице"),
+        cursor: int | None = Query(None, description="Курсор следующей страницы из заголовка X-Next-Cursor"),
+        session: AsyncSession = Depends(get_async_session),
+):
+    # Создать экземпляр класса для работы с базой данной.
+    db_manager = DatabaseManager()
+    try:
+        if not await has_area(session, area_id):
+            return JSONResponse(
+                status_code=404,
+                content={
+                    "status": 404,
+                    "message": f"Область с id {area_id} не найдена."
+                }
+            )
+        # Запросить на одну строку больше, чтобы узнать, есть ли следующая страница.
+        rows = await db_manager.get_perevals_in_area(session, area_id, limit + 1, cursor)
+    # Обработать ошибки вызванные SQLAlchemy.
+    except SQLAlchemyError as e:
+        return JSONResponse(
+            status_code=500,
+            content={
+                "status": 500,
+                "message": f"Ошибка подключения к базе данных: {e}"
+            }
+        )
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = str(rows[-1]["id"])
+    items = AREA_PEREVAL_LIST_ADAPTER.validate_python([
+        {
+            "id": row["id"],
+            "beauty_title": row["beauty_title"],
+            "title": row["title"],
+            "status": row["status"],
+            "coords": {"latitude": row["latitude"], "longitude": row["longitude"], "height": row["height"]},
+            "area_id": row["area_id"],
+        }
+        for row in rows
+    ])
+    return json_response(AREA_PEREVAL_LIST_ADAPTER.dump_json(items), headers)
@@ -0,0 +1,117 @@
+import re
+
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Header, Query
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.endpoints.pereval import get_async_session, etag_matches
+from app.db.repositories.pereval import DatabaseManager
+from app.storage.blob_store import blob_store
+from app.storage.image_variants import find_variant, VARIANT_MIME_TYPE
+
+
+router = APIRouter()
+
+# Изображение с заданным "id" никогда не меняется, поэтому его можно кешировать навсегда.
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Шаблон заголовка Range с одним диапазоном байтов.
+RANGE_PATTERN = re.compile(r"bytes=(\d*)-(\d*)")
+
+
+# Функция, разбирающая заголовок Range.
+# Возвращает диапазон (start, end) включительно, None для ответа целиком
+# (заголовка нет, он не поддерживается или некорректен) или "ValueError",
+# если диапазон корректен, но недостижим (RFC 9110, раздел 14.2).
+def parse_range(range_header: str | None, size: int) -> tuple[int, int] | None:
+    if not range_header:
+        return None
+    match = RANGE_PATTERN.fullmatch(range_header.strip())
+    # Несколько диапазонов и другие единицы измерения не поддерживаются, вернуть файл целиком.
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+    start, end = match.groups()
+    # Диапазон вида "bytes=-N" - последние N байтов.
+    if start == "":
+        length = int(end)
+        if length == 0 or size == 0:
+            raise ValueError
+        return max(size - length, 0), size - 1
+    start = int(start)
+    # Диапазон, в котором конец меньше начала, некорректен: заголовок игнорируется.
+    if end != "" and int(end) < start:
+        return None
+    if start >= size:
+        raise ValueError
+    end = size - 1 if end == "" else min(int(end), size - 1)
+    return start, end
+
+
+# endpoint, отдающий содержимое изображения потоком.
+# Поддерживает условные запросы (If-None-Match) и запросы части файла (Range, If-Range).
+# Параметр "variant" выбирает уменьшенную копию изображения.
+@router.get("/images/{id}")
+async def get_image_on_id(
+        id: int,
+        variant: Literal["original", "thumb", "medium"] = Query("original", description="Исходное изображение или копия"),
+        range_header: str | None = Header(None, alias="Range"),
+        if_none_match: str | None = Header(None),
+        if_range: str | None = Header(None),
+        session: AsyncSession = Depends(get_async_session),
+):
+    # Создать экземпляр класса для работы с базой данной.
+    db_manager = DatabaseManager()
+    image = await db_manager.get_image_on_id(session, id)
+    if image is None or not await blob_store.exists(image.sha256):
+        return JSONResponse(
+            status_code=404,
+            content={
+                "status": 404,
+                "message": f"Изображение с id {id} отсутствует."
+            }
+        )
+
+    key, size, mime_type = image.sha256, image.size, image.mime_type
+    cache_control = CACHE_CONTROL
+    if variant != "original":
+        variant_key = await find_variant(image.sha256, variant)
+        if variant_key is not None:
+            key, size, mime_type = variant_key, await blob_store.size(variant_key), VARIANT_MIME_TYPE
+        else:
+            # Копия ещё не создана или не нужна - отдать исходное изображение, не разрешая кешировать его надолго.
+            cache_control = "no-cache"
+
+    # Хеш содержимого однозначно определяет изображение и служит сильным ETag.
+    etag = f'"{key}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": cache_control,
+        "Accept-Ranges": "bytes",
+    }
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    # Если If-Range не совпадает с текущим ETag, отдать изображение целиком.
+    if if_range is not None and if_range.strip() != etag:
+        range_header = None
+    try:
+        byte_range = parse_range(range_header, size)
+    except ValueError:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+    status_code = 200
+    start, end = 0, size - 1
+    if byte_range is not None:
+        status_code = 206
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+
+    return StreamingResponse(
+        blob_store.iter_range(key, start, end),
+        status_code=status_code,
+        media_type=mime_type,
+        headers=headers,
+    )
@@ -0,0 +1,22 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core.metrics import registry
+from app.db.database import engine
+from app.db.pool import pool_status
+
+
+router = APIRouter()
+
+
+# endpoint, возвращающий текущее состояние пула соединений с базой данных:
+# занятые и свободные соединения, соединения сверх pool_size, время ожидания соединения.
+@router.get("/metrics/pool")
+async def get_pool_metrics():
+    return pool_status(engine.pool)
+
+
+# endpoint, возвращающий метрики сервиса в текстовом формате Prometheus.
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,104 @@
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.endpoints.pereval import get_async_session
+from app.api.schemas.pereval import ModerationIdsSchema, ModerationPerevalSchema
+from app.db.models import StatusPereval
+from app.db.repositories.pereval import DatabaseManager
+
+
+router = APIRouter()
+
+
+# Функция, меняющая статус перевалов из списка и формирующая ответ:
+# "updated" - перевалы, статус которых изменён, "skipped" - перевалы, которых нет или у которых другой статус.
+async def _set_status(
+        session: AsyncSession,
+        ids: list[int],
+        from_statuses: tuple[StatusPereval, ...],
+        to_status: StatusPereval
+) -> JSONResponse:
+    # Создать экземпляр класса для работы с базой данной.
+    db_manager = DatabaseManager()
+    try:
+        updated = await db_manager.set_perevals_status(session, ids, from_statuses, to_status)
+    # Обработать ошибки вызванные SQLAlchemy.
+    except SQLAlchemyError as e:
+        return JSONResponse(
+            status_code=500,
+            content={
+                "status": 500,
+                "message": f"Ошибка подключения к базе данных: {e}"
+            }
+        )
+    skipped = sorted(set(ids) - set(updated))
+    return JSONResponse(
+        status_code=200,
+        content={
+            "status": 200,
+            "message": None,
+            "updated": updated,
+            "skipped": skipped
+        }
+    )
+
+
+# endpoint, забирающий на модерацию пачку перевалов со статусом "Ожидает модерации".
+# Статус забранных перевалов меняется на "На модерации". Несколько модераторов
+# могут забирать перевалы одновременно: один перевал не достанется двоим.
+@router.post("/moderation/claim")
+async def claim_perevals(
+        limit: int = Query(10, ge=1, le=100, description="Количество перевалов"),
+        session: AsyncSession = Depends(get_async_session),
+):
+    # Создать экземпляр класса для работы с базой данной.
+    db_manager = DatabaseManager()
+    try:
+        rows = await db_manager.claim_perevals_for_moderation(session, limit)
+    # Обработать ошибки вызванные SQLAlchemy.
+    except SQLAlchemyError as e:
+        return JSONResponse(
+            status_code=500,
+            content={
+                "status": 500,
+                "message": f"Ошибка подключения к базе данных: {e}"
+            }
+        )
+    return JSONResponse(
+        status_code=200,
+        content={
+            "status": 200,
+            "message": None,
+            "perevals": [ModerationPerevalSchema.model_validate(dict(row)).model_dump(mode="json") for row in rows]
+        }
+    )
+
+
+# endpoint, принимающий перевалы из списка "id", забранные на модерацию.
+@router.post("/moderation/accept")
+async def accept_perevals(
+        body: ModerationIdsSchema,
+        session: AsyncSession = Depends(get_async_session),
+):
+    return await _set_status(session, body.ids, (StatusPereval.PENDING,), StatusPereval.ACCEPTED)
+
+
+# endpoint, отклоняющий перевалы из списка "id", забранные на модерацию.
+@router.post("/moderation/reject")
+async def reject_perevals(
+        body: ModerationIdsSchema,
+        session: AsyncSession = Depends(get_async_session),
+):
+    return await _set_status(session, body.ids, (StatusPereval.PENDING,), StatusPereval.REJECTED)
+
+
+# endpoint, возвращающий забранные на модерацию перевалы из списка "id" в очередь
+# (статус "Ожидает модерации"), например если модератор не успел их проверить.
+@router.post("/moderation/release")
+async def release_perevals(
+        body: ModerationIdsSchema,
+        session: AsyncSession = Depends(get_async_session),
+):
+    return await _set_status(session, body.ids, (StatusPereval.PENDING,), StatusPereval.NEW)
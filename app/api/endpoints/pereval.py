@@ -1,22 +1,38 @@
 import base64
+import hashlib
+import json
 import logging
-from typing import List
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import List, Any, Dict, Literal, AsyncIterator
 
-from fastapi import APIRouter, Depends, Query, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, Query, HTTPException, Body, Header, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import ValidationError, EmailStr
-from sqlalchemy.exc import SQLAlchemyError
+from starlette.datastructures import UploadFile
+from starlette.formparsers import MultiPartParser, MultiPartException
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError, DataError
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.api.schemas.pereval import (
     PerevalCreateSchema,
     PerevalReadSchema,
-    CoordSchema,
-    UserSchema,
+    PerevalPartialReadSchema,
     ImageSchema,
-    PerevalUpdateSchema
+    ImageLinkSchema,
+    PerevalUpdateSchema,
+    PerevalChangesSchema,
+    PEREVAL_LIST_ADAPTER,
+    PEREVAL_PARTIAL_LIST_ADAPTER
 )
+from app.db.models import PImage, PerevalAdded, User
 from app.db.repositories.pereval import DatabaseManager
 from app.db.database import async_session_maker
+from app.core.areas import has_area
+from app.core.cache import pereval_cache, pereval_cache_key
+from app.core.config import settings
+from app.storage.blob_store import blob_store, FileTooLargeError
+from app.storage.image_codec import encode_image, check_image_size
+from app.storage.image_variants import find_variant
 
 
 router = APIRouter()
@@ -28,6 +44,229 @@ async def get_async_session():
         yield session
 
 
+# Функция, преобразующая изображение в Pydantic-схему.
+# При image_format="url" вернуть ссылку на GET /images/{id} и описание изображения,
+# иначе прочитать изображение из хранилища файлов и закодировать его в base64.
+# Если запрошена уменьшенная копия, ссылка ведёт на неё, а в base64 кодируется копия (или исходное
+# изображение, если копия ещё не создана). Размер и MIME-тип в ссылке относятся к исходному изображению.
+# Если вместо копии закодировано исходное изображение, "id" изображения добавляется в список "fallbacks".
+async def _image_to_schema(
+        image: PImage,
+        image_format: str = "data",
+        image_variant: str = "original",
+        fallbacks: list[int] | None = None
+) -> ImageSchema | ImageLinkSchema:
+    if image_format == "url":
+        return ImageLinkSchema(
+            id=image.id,
+            title=image.title,
+            url=f"/images/{image.id}" if image_variant == "original" else f"/images/{image.id}?variant={image_variant}",
+            size=image.size,
+            mime_type=image.mime_type
+        )
+    key = await find_variant(image.sha256, image_variant)
+    if key is None and image_variant != "original" and fallbacks is not None:
+        fallbacks.append(image.id)
+    data = await blob_store.get(key or image.sha256)
+    return ImageSchema(data=await encode_image(data), title=image.title)
+
+
+# Поля перевала, которые можно запросить параметром "fields".
+PEREVAL_FIELDS = tuple(PerevalReadSchema.model_fields)
+# Поля, хранящиеся в связанных моделях, а не в столбцах таблицы "pereval_added".
+PEREVAL_RELATED_FIELDS = ("user", "coords", "images")
+
+
+# Функция, преобразующая экземпляр PerevalAdded в Pydantic-схему.
+# Заполняются только поля из "fields"; если заданы не все поля, возвращается PerevalPartialReadSchema.
+# Связанные модели (пользователь, координаты) читаются из атрибутов ORM при единственной проверке схемы.
+async def _pereval_to_schema(
+        pereval: PerevalAdded,
+        image_format: str = "data",
+        fields: tuple[str, ...] = PEREVAL_FIELDS,
+        image_variant: str = "original",
+        fallbacks: list[int] | None = None
+) -> PerevalReadSchema:
+    values = {}
+    for field in fields:
+        if field == "user":
+            values["user"] = pereval.creator
+        elif field == "images":
+            values["images"] = [
+                await _image_to_schema(img.image, image_format, image_variant, fallbacks) for img in pereval.images
+            ]
+        else:
+            values[field] = getattr(pereval, field)
+    if len(fields) == len(PEREVAL_FIELDS):
+        return PerevalReadSchema.model_validate(values, from_attributes=True)
+    return PerevalPartialReadSchema.model_validate(values, from_attributes=True)
+
+
+# Функция, возвращающая уже сериализованный JSON.
+# Схемы проверены при создании, поэтому ответ не проходит повторную проверку через response_model.
+def json_response(body: bytes, headers: dict | None = None) -> Response:
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+# Функция, сериализующая список перевалов в JSON за один вызов.
+# У неполных перевалов в ответ попадают только запрошенные поля.
+def _perevals_to_json(perevals: list[PerevalReadSchema], partial: bool) -> bytes:
+    if partial:
+        return PEREVAL_PARTIAL_LIST_ADAPTER.dump_json(perevals, exclude_unset=True)
+    return PEREVAL_LIST_ADAPTER.dump_json(perevals)
+
+
+# Функция, переводящая поля перевала в параметры проекции запроса DatabaseManager.
+def _projection(fields: tuple[str, ...]) -> dict:
+    return {
+        "columns": [field for field in fields if field not in PEREVAL_RELATED_FIELDS],
+        "with_coords": "coords" in fields,
+        "with_images": "images" in fields,
+    }
+
+
+# Асинхронный генератор строк NDJSON: один перевал пользователя в каждой строке.
+# Перевалы читаются курсором на стороне сервера, поэтому в памяти находится только текущая порция.
+# Сессия открывается здесь, т.к. сессия из зависимости закрывается до начала отправки потока.
+async def _stream_perevals_ndjson(
+        user: User,
+        image_format: str,
+        image_variant: str,
+        fields: tuple[str, ...],
+        limit: int | None,
+        after: tuple[datetime, int] | None
+) -> AsyncIterator[str]:
+    db_manager = DatabaseManager()
+    async with async_session_maker() as session:
+        async for pereval in db_manager.stream_perevals_of_user(
+                session, user, limit=limit, after=after, **_projection(fields)
+        ):
+            schema = await _pereval_to_schema(pereval, image_format, fields, image_variant)
+            yield schema.model_dump_json(exclude_unset=True) + "\n"
+
+
+# Функция, кодирующая позицию перевала в строку-курсор для keyset-пагинации.
+def _encode_cursor(pereval: PerevalAdded) -> str:
+    return base64.urlsafe_b64encode(f"{pereval.add_time.isoformat()}|{pereval.id}".encode()).decode()
+
+
+# Функция, декодирующая строку-курсор. При некорректном курсоре вызвать "ValueError".
+def _decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        add_time, pereval_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(add_time), int(pereval_id)
+    except Exception:
+        raise ValueError(f"Некорректный курсор: {cursor}")
+
+
+# Функция, кодирующая курсор изменений перевалов: номер транзакции изменения и "id" перевала.
+def _encode_change_cursor(change_xid: int, pereval_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{change_xid}|{pereval_id}".encode()).decode()
+
+
+# Функция, декодирующая курсор изменений перевалов. При некорректном курсоре вызвать "ValueError".
+def _decode_change_cursor(cursor: str) -> tuple[int, int]:
+    try:
+        change_xid, pereval_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return int(change_xid), int(pereval_id)
+    except Exception:
+        raise ValueError(f"Некорректный курсор: {cursor}")
+
+
+# Функция, проверяющая, совпадает ли ETag с одним из значений заголовка If-None-Match.
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    # Слабое сравнение: префикс "W/" не учитывается.
+    return "*" in tags or etag.removeprefix("W/") in [tag.removeprefix("W/") for tag in tags]
+
+
+# Функция, получающая версию перевала из заголовка If-Match.
+# ETag перевала имеет вид "<id>-<версия>-<формат изображений>-<копия>" (см. GET /submit_data/{id}).
+# Если заголовка нет или он равен "*", версия не проверяется. Если ETag не относится к перевалу, вызвать 412.
+def _version_from_if_match(if_match: str | None, pereval_id: int) -> int | None:
+    if if_match is None or if_match.strip() == "*":
+        return None
+    parts = if_match.strip().removeprefix("W/").strip('"').split("-")
+    if len(parts) < 2 or parts[0] != str(pereval_id) or not parts[1].isdigit():
+        raise HTTPException(status_code=412, detail=f"Некорректный заголовок If-Match: {if_match}")
+    return int(parts[1])
+
+
+# Запас на расхождение часов приложения и базы данных при проверке, закончилась ли секунда изменения.
+LAST_MODIFIED_MARGIN = timedelta(seconds=1)
+
+
+# Функция, переводящая время изменения в значение заголовка Last-Modified (с точностью до секунды).
+# Время округляется вверх до целой секунды. Пока секунда изменения не закончилась, заголовок не передаётся:
+# следующее изменение в ту же секунду получило бы тот же Last-Modified, и клиент без ETag
+# получил бы ошибочный ответ 304 (RFC 9110, раздел 8.8.2.2).
+def _last_modified(updated_at: datetime) -> datetime | None:
+    updated_at = updated_at.astimezone(timezone.utc)
+    if updated_at.microsecond:
+        updated_at = updated_at.replace(microsecond=0) + timedelta(seconds=1)
+    if datetime.now(timezone.utc) < updated_at + LAST_MODIFIED_MARGIN:
+        return None
+    return updated_at
+
+
+# Функция, формирующая заголовки для условных GET-запросов.
+# Клиент должен перепроверять ответ при каждом запросе (no-cache), получая 304, если он не изменился.
+def _validator_headers(etag: str, updated_at: datetime | None) -> dict:
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    last_modified = _last_modified(updated_at) if updated_at is not None else None
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    return headers
+
+
+# Функция, убирающая ETag и Last-Modified из заголовков ответа, в котором вместо уменьшенных копий
+# изображений закодированы исходные (копии ещё не созданы или не нужны). Такой ответ не кешируется,
+# иначе клиент продолжал бы получать 304 и исходные изображения после появления копий.
+def _without_validators(headers: dict) -> dict:
+    return {key: value for key, value in headers.items() if key not in ("ETag", "Last-Modified")}
+
+
+# Функция, проверяющая, можно ли ответить "304 Not Modified".
+# If-None-Match имеет приоритет, If-Modified-Since учитывается только без него.
+def _is_not_modified(
+        headers: dict,
+        if_none_match: str | None,
+        if_modified_since: str | None
+) -> bool:
+    if if_none_match is not None:
+        return etag_matches(if_none_match, headers["ETag"])
+    if if_modified_since and "Last-Modified" in headers:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return parsedate_to_datetime(headers["Last-Modified"]) <= since
+    return False
+
+
+# Параметр запроса, выбирающий способ вывода изображений в ответе.
+ImageFormatQuery = Query(
+    "data",
+    description="data - изображения в base64, url - ссылки на GET /images/{id} с описанием изображений"
+)
+
+
+# Параметр запроса, выбирающий исходные изображения или их уменьшенные копии.
+ImageVariantQuery = Query(
+    "original",
+    description="original - исходные изображения, thumb и medium - уменьшенные копии (если они уже созданы)"
+)
+
+
+# Проверить, что область перевала ("area_id") есть в справочнике "pereval_areas".
+async def _check_area(session: AsyncSession, data: dict) -> None:
+    area_id = data.get("area_id")
+    if area_id is not None and not await has_area(session, area_id):
+        raise HTTPException(status_code=400, detail=f"Область с id {area_id} не найдена.")
+
+
 # endpoint, добавляющий данные о новом перевале в базу данных.
 @router.post("/submit_data")
 async def create_pereval(
@@ -40,6 +279,8 @@ async def create_pereval(
     # Создать экземпляр класса для работы с базой данной.
     db_manager = DatabaseManager()
     try:
+        # Проверить область перевала.
+        await _check_area(session, data)
         # Обработать данные о перевале.
         # Создать экземпляры классов User (если такого пользователя нет), Coord, PerevalAdded, PImage, PerevalImage.
         # Получить и сохранить в переменной id перевала.
@@ -52,6 +293,16 @@ async def create_pereval(
                 "id": result_id
             }
         )
+    # Обработать неизвестную область перевала.
+    except HTTPException as e:
+        return JSONResponse(
+            status_code=e.status_code,
+            content={
+                "status": e.status_code,
+                "message": e.detail,
+                "id": None
+            }
+        )
     # Обработать ошибки входных данных.
     except KeyError as e:
         return JSONResponse(
@@ -62,6 +313,252 @@ async def create_pereval(
                 "id": None
             }
         )
+    # Обработать слишком большие изображения.
+    except FileTooLargeError as e:
+        return JSONResponse(
+            status_code=413,
+            content={
+                "status": 413,
+                "message": str(e),
+                "id": None
+            }
+        )
+    # Обработать ошибки вызванные SQLAlchemy.
+    except SQLAlchemyError as e:
+        return JSONResponse(
+            status_code=500,
+            content={
+                "status": 500,
+                "message": f"Ошибка подключения к базе данных: {e}",
+                "id": None
+            }
+        )
+    # Обработать все остальные ошибки.
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={
+                "status": 500,
+                "message": str(e),
+                "id": None
+            }
+        )
+
+
+# endpoint, быстро сохраняющий перевал и возвращающий его "id" (202 Accepted).
+# Изображения сохраняются в фоне обработчиком очереди задач (python -m app.jobs.worker)
+# и появляются у перевала после обработки.
+@router.post("/submit_data/async", status_code=202)
+async def create_pereval_async(
+        pereval: PerevalCreateSchema,
+        session: AsyncSession = Depends(get_async_session),
+):
+    data = pereval.model_dump(by_alias=True)
+    # Создать экземпляр класса для работы с базой данной.
+    db_manager = DatabaseManager()
+    try:
+        # Проверить размер изображений сразу, чтобы не ставить в очередь заведомо невыполнимую задачу.
+        for image in data["images"]:
+            check_image_size(len(image["data"]) * 3 // 4)
+        await _check_area(session, data)
+        result_id = await db_manager.add_pereval_deferred(session, data)
+        return JSONResponse(
+            status_code=202,
+            content={
+                "status": 202,
+                "message": None,
+                "id": result_id
+            }
+        )
+    # Обработать неизвестную область перевала.
+    except HTTPException as e:
+        return JSONResponse(
+            status_code=e.status_code,
+            content={
+                "status": e.status_code,
+                "message": e.detail,
+                "id": None
+            }
+        )
+    # Обработать слишком большие изображения.
+    except FileTooLargeError as e:
+        return JSONResponse(
+            status_code=413,
+            content={
+                "status": 413,
+                "message": str(e),
+                "id": None
+            }
+        )
+    # Обработать ошибки вызванные SQLAlchemy.
+    except SQLAlchemyError as e:
+        return JSONResponse(
+            status_code=500,
+            content={
+                "status": 500,
+                "message": f"Ошибка подключения к базе данных: {e}",
+                "id": None
+            }
+        )
+    # Обработать все остальные ошибки.
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={
+                "status": 500,
+                "message": str(e),
+                "id": None
+            }
+        )
+
+
+# Тело запроса multipart/form-data больше MAX_MULTIPART_SIZE.
+# Наследуется от MultiPartException, чтобы парсер закрыл уже принятые файлы.
+class _MultipartTooLargeError(MultiPartException):
+    pass
+
+
+# Читать тело запроса по частям, прерывая приём, как только превышен лимит размера.
+async def _limited_stream(request: Request, limit: int) -> AsyncIterator[bytes]:
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > limit:
+            raise _MultipartTooLargeError(f"Размер запроса превышает {limit} байт")
+        yield chunk
+
+
+# Описание тела запроса для документации: поля разбираются в endpoint, а не FastAPI.
+MULTIPART_REQUEST_BODY = {
+    "required": True,
+    "content": {
+        "multipart/form-data": {
+            "schema": {
+                "type": "object",
+                "required": ["pereval"],
+                "properties": {
+                    "pereval": {"type": "string", "description": "Данные перевала в формате JSON"},
+                    "images": {
+                        "type": "array",
+                        "items": {"type": "string", "format": "binary"},
+                        "description": "Файлы изображений",
+                    },
+                    "titles": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Названия изображений в порядке файлов",
+                    },
+                },
+            }
+        }
+    },
+}
+
+
+# endpoint, добавляющий перевал с изображениями в виде файлов (multipart/form-data).
+# Данные перевала передаются полем "pereval" в формате JSON, как в POST /submit_data
+# (поле "images" можно не указывать), файлы изображений - полями "images", их названия - полями "titles".
+# Размер тела ограничен MAX_MULTIPART_SIZE: запрос проверяется по Content-Length до приёма
+# и по числу принятых байт при разборе, так что слишком большой запрос не сохраняется на диск целиком.
+@router.post("/submit_data/multipart", openapi_extra={"requestBody": MULTIPART_REQUEST_BODY})
+async def create_pereval_multipart(
+        request: Request,
+        session: AsyncSession = Depends(get_async_session),
+):
+    # Отклонить запрос с заведомо большим телом, не принимая его.
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > settings.MAX_MULTIPART_SIZE:
+        return JSONResponse(
+            status_code=413,
+            content={
+                "status": 413,
+                "message": f"Размер запроса превышает {settings.MAX_MULTIPART_SIZE} байт",
+                "id": None
+            }
+        )
+
+    form = None
+    try:
+        if "multipart/form-data" not in request.headers.get("content-type", ""):
+            raise ValueError("ожидается запрос в формате multipart/form-data")
+        parser = MultiPartParser(request.headers, _limited_stream(request, settings.MAX_MULTIPART_SIZE))
+        form = await parser.parse()
+
+        pereval = form.get("pereval")
+        if not isinstance(pereval, str):
+            raise ValueError("поле pereval с данными перевала в формате JSON обязательно")
+        images = form.getlist("images")
+        if not all(isinstance(upload, UploadFile) for upload in images):
+            raise ValueError("поля images должны быть файлами")
+        titles = [title for title in form.getlist("titles") if isinstance(title, str)]
+
+        # Проверить данные перевала так же, как в POST /submit_data.
+        values = json.loads(pereval)
+        values.setdefault("images", [])
+        data = PerevalCreateSchema.model_validate(values).model_dump(by_alias=True)
+        await _check_area(session, data)
+
+        # Сохранить файлы в хранилище. Название изображения по умолчанию - имя файла.
+        for index, upload in enumerate(images):
+            key, size, mime_type = await blob_store.add_stream(upload.file, settings.MAX_IMAGE_SIZE)
+            data["images"].append({
+                "title": titles[index] if index < len(titles) else upload.filename or "",
+                "sha256": key,
+                "size": size,
+                "mime_type": mime_type,
+            })
+
+        # Создать экземпляр класса для работы с базой данной.
+        db_manager = DatabaseManager()
+        result_id = await db_manager.add_pereval(session, data)
+        return JSONResponse(
+            status_code=200,
+            content={
+                "status": 200,
+                "message": None,
+                "id": result_id
+            }
+        )
+    # Обработать ошибку валидации данных перевала.
+    except ValidationError as e:
+        return JSONResponse(
+            status_code=422,
+            content={
+                "status": 422,
+                "message": f"Ошибка валидации: {e.errors()}",
+                "id": None
+            }
+        )
+    # Обработать неизвестную область перевала.
+    except HTTPException as e:
+        return JSONResponse(
+            status_code=e.status_code,
+            content={
+                "status": e.status_code,
+                "message": e.detail,
+                "id": None
+            }
+        )
+    # Обработать слишком большие изображения и слишком большой запрос.
+    except (FileTooLargeError, _MultipartTooLargeError) as e:
+        return JSONResponse(
+            status_code=413,
+            content={
+                "status": 413,
+                "message": str(e),
+                "id": None
+            }
+        )
+    # Обработать некорректное тело запроса и некорректный JSON в поле "pereval".
+    except (MultiPartException, ValueError) as e:
+        return JSONResponse(
+            status_code=400,
+            content={
+                "status": 400,
+                "message": f"Некорректные данные перевала: {e}",
+                "id": None
+            }
+        )
     # Обработать ошибки вызванные SQLAlchemy.
     except SQLAlchemyError as e:
         return JSONResponse(
@@ -82,58 +579,151 @@ async def create_pereval(
                 "id": None
             }
         )
+    # Закрыть временные файлы, в которые парсер сохранил изображения.
+    finally:
+        if form is not None:
+            await form.close()
+
+
+# Наибольшее количество перевалов в одном запросе POST /submit_data/batch.
+MAX_BATCH_SIZE = 1000
+
+
+# endpoint, добавляющий в базу данных пачку перевалов в одной транзакции.
+# Каждый перевал проверяется отдельно, в ответе для каждого возвращается "id" или ошибка.
+# Если "atomic" = true, ошибка любого перевала отменяет добавление всей пачки.
+@router.post("/submit_data/batch")
+async def create_perevals_batch(
+        perevals: List[Dict[str, Any]] = Body(
+            ..., max_length=MAX_BATCH_SIZE, description="Список перевалов в формате POST /submit_data"
+        ),
+        atomic: bool = Query(False, description="Отменить добавление всей пачки при любой ошибке"),
+        session: AsyncSession = Depends(get_async_session),
+):
+    # Провалидировать каждый перевал отдельно, чтобы ошибка одного не отклоняла весь запрос.
+    results: list[dict] = [{} for _ in perevals]
+    valid_indexes = []
+    valid_data = []
+    for index, item in enumerate(perevals):
+        try:
+            data = PerevalCreateSchema.model_validate(item).model_dump(by_alias=True)
+        except ValidationError as e:
+            results[index] = {"status": 400, "message": str(e), "id": None}
+            continue
+        try:
+            await _check_area(session, data)
+        except HTTPException as e:
+            results[index] = {"status": e.status_code, "message": e.detail, "id": None}
+            continue
+        except SQLAlchemyError as e:
+            return JSONResponse(
+                status_code=500,
+                content={
+                    "status": 500,
+                    "message": f"Ошибка подключения к базе данных: {e}",
+                    "results": None
+                }
+            )
+        valid_indexes.append(index)
+        valid_data.append(data)
+
+    # Если пачка должна быть добавлена целиком, не обращаться к базе при ошибках валидации.
+    if atomic and len(valid_data) != len(perevals):
+        for index in valid_indexes:
+            results[index] = {"status": 409, "message": "Пачка отклонена из-за ошибок в других перевалах.", "id": None}
+        return JSONResponse(
+            status_code=400,
+            content={"status": 400, "message": "Пачка содержит некорректные перевалы.", "results": results}
+        )
+
+    # Создать экземпляр класса для работы с базой данной.
+    db_manager = DatabaseManager()
+    try:
+        inserted = await db_manager.add_perevals(session, valid_data, atomic=atomic)
+    # Обработать слишком большие изображения (если пачка добавляется целиком).
+    except FileTooLargeError as e:
+        return JSONResponse(
+            status_code=413,
+            content={"status": 413, "message": str(e), "results": None}
+        )
+    # Обработать данные, нарушающие ограничения базы данных (если пачка добавляется целиком).
+    except (IntegrityError, DataError) as e:
+        return JSONResponse(
+            status_code=400,
+            content={"status": 400, "message": f"Некорректные данные перевала: {e.orig}", "results": None}
+        )
+    # Обработать ошибки вызванные SQLAlchemy.
+    except SQLAlchemyError as e:
+        return JSONResponse(
+            status_code=500,
+            content={
+                "status": 500,
+                "message": f"Ошибка подключения к базе данных: {e}",
+                "results": None
+            }
+        )
+    # Обработать все остальные ошибки.
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={"status": 500, "message": str(e), "results": None}
+        )
+
+    for index, (result_id, status, message) in zip(valid_indexes, inserted):
+        results[index] = {"status": status, "message": message, "id": result_id}
+    return JSONResponse(
+        status_code=200,
+        content={"status": 200, "message": None, "results": results}
+    )
 
 
 # endpoint, возвращающий данные о перевале по "id".
 @router.get("/submit_data/{id}", response_model=PerevalReadSchema)
 async def get_pereval_on_id(
         id: int,
+        image_format: Literal["data", "url"] = ImageFormatQuery,
+        image_variant: Literal["original", "thumb", "medium"] = ImageVariantQuery,
+        if_none_match: str | None = Header(None),
+        if_modified_since: str | None = Header(None),
         session: AsyncSession = Depends(get_async_session),
 ):
     # Создать экземпляр класса для работы с базой данной.
     db_manager = DatabaseManager()
     try:
-        # Получить перевал по запрашиваемому "id".
+        # Получить версию перевала лёгким запросом без связанных моделей.
         # Если такого "id" нет, вызвать "ValueError"
-        pereval = await db_manager.get_pereval_on_id(session, id)
-        if pereval is None:
+        version = await db_manager.get_pereval_version(session, id)
+        if version is None:
             raise ValueError
-        # Преобразовать экземпляр класса в Pydantic-схему и вернуть её.
-        return PerevalReadSchema(
-            status=pereval.status,
-            beauty_title=pereval.beauty_title,
-            title=pereval.title,
-            other_titles=pereval.other_titles,
-            connect=pereval.connect,
-            add_time=pereval.add_time,
-            user=UserSchema(
-                email=pereval.creator.email,
-                fam=pereval.creator.fam,
-                name=pereval.creator.name,
-                otc=pereval.creator.otc,
-                phone=pereval.creator.phone,
-            ),
-            coords=CoordSchema(
-                latitude=pereval.coords.latitude,
-                longitude=pereval.coords.longitude,
-                height=pereval.coords.height,
-            ),
-            level_winter=pereval.level_winter,
-            level_summer=pereval.level_summer,
-            level_autumn=pereval.level_autumn,
-            level_spring=pereval.level_spring,
-            images=[
-                ImageSchema(
-                    data=base64.b64encode(
-                        img.image.img.encode('utf-8')
-                        if isinstance(img.image.img, str)
-                        else img.image.img
-                    )
-                    .decode("utf-8"),
-                    title=img.image.title
-                ) for img in pereval.images
-            ]
-        )
+        pereval_version, updated_at = version
+        headers = _validator_headers(f'"{id}-{pereval_version}-{image_format}-{image_variant}"', updated_at)
+        # Если у клиента актуальная версия перевала, не загружать и не отправлять его.
+        if _is_not_modified(headers, if_none_match, if_modified_since):
+            return Response(status_code=304, headers=headers)
+
+        # Вернуть готовый ответ из кеша, если он там есть.
+        cache_key = pereval_cache_key(id, pereval_version, image_format, image_variant)
+        body = await pereval_cache.get(cache_key)
+        if body is None:
+            # Получить перевал по запрашиваемому "id".
+            # Если такого "id" нет, вызвать "ValueError"
+            pereval = await db_manager.get_pereval_on_id(session, id)
+            if pereval is None:
+                raise ValueError
+            # Преобразовать экземпляр класса в Pydantic-схему и сериализовать.
+            fallbacks = []
+            schema = await _pereval_to_schema(pereval, image_format, image_variant=image_variant, fallbacks=fallbacks)
+            body = schema.model_dump_json().encode("utf-8")
+            if fallbacks:
+                return json_response(body, _without_validators(headers))
+            # Если перевал изменился после получения версии, отдать новые данные с новыми заголовками.
+            if pereval.version != pereval_version:
+                headers = _validator_headers(
+                    f'"{id}-{pereval.version}-{image_format}-{image_variant}"', pereval.updated_at
+                )
+                cache_key = pereval_cache_key(id, pereval.version, image_format, image_variant)
+            await pereval_cache.set(cache_key, body)
+        return json_response(body, headers)
     # Обработать ошибку отсутствия перевала с запрашиваемым "id".
     except ValueError as e:
         return JSONResponse(
@@ -155,57 +745,89 @@ async def get_pereval_on_id(
 
 
 # endpoint, возвращающий список перевалов, добавленных пользователем с запрашиваемым email.
-@router.get("/submit_data/", response_model=List[PerevalReadSchema])
+@router.get(
+    "/submit_data/",
+    response_model=List[PerevalReadSchema],
+    responses={200: {"content": {"application/x-ndjson": {}}}}
+)
 async def get_perevals_on_email(
+        request: Request,
         user__email: EmailStr = Query(..., alias="user__email", description="Email пользователя"),
+        image_format: Literal["data", "url"] = ImageFormatQuery,
+        image_variant: Literal["original", "thumb", "medium"] = ImageVariantQuery,
+        limit: int | None = Query(None, ge=1, le=1000, description="Количество перевалов на странице"),
+        cursor: str | None = Query(None, description="Курсор следующей страницы из заголовка X-Next-Cursor"),
+        fields: str | None = Query(None, description=f"Поля перевала через запятую: {', '.join(PEREVAL_FIELDS)}"),
+        include_images: bool = Query(True, description="Загружать ли изображения перевалов"),
+        accept: str | None = Header(None),
+        if_none_match: str | None = Header(None),
+        if_modified_since: str | None = Header(None),
         session: AsyncSession = Depends(get_async_session),
 ):
     # Создать экземпляр класса для работы с базой данной.
     db_manager = DatabaseManager()
     try:
-        # Получить перевалы по запрашиваемому email.
-        perevals = await db_manager.get_perevals_on_email(session, user__email)
-        # Явно преобразовать экземпляры PerevalAdded в Pydantic-схему и вернуть этот список.
-        result_perevals = []
-        for pereval in perevals:
-            result_perevals.append(
-                PerevalReadSchema(
-                    status=pereval.status,
-                    beauty_title=pereval.beauty_title,
-                    title=pereval.title,
-                    other_titles=pereval.other_titles,
-                    connect=pereval.connect,
-                    add_time=pereval.add_time,
-                    user=UserSchema(
-                        email=pereval.creator.email,
-                        fam=pereval.creator.fam,
-                        name=pereval.creator.name,
-                        otc=pereval.creator.otc,
-                        phone=pereval.creator.phone,
-                    ),
-                    coords=CoordSchema(
-                        latitude=pereval.coords.latitude,
-                        longitude=pereval.coords.longitude,
-                        height=pereval.coords.height,
-                    ),
-                    level_winter=pereval.level_winter,
-                    level_summer=pereval.level_summer,
-                    level_autumn=pereval.level_autumn,
-                    level_spring=pereval.level_spring,
-                    images=[
-                        ImageSchema(
-                            data=base64.b64encode(
-                                img.image.img.encode('utf-8')
-                                if isinstance(img.image.img, str)
-                                else img.image.img
-                            )
-                            .decode("utf-8"),
-                            title=img.image.title
-                        ) for img in pereval.images
-                    ]
+        # Определить запрошенные поля. Неизвестные поля - ошибка запроса.
+        requested = PEREVAL_FIELDS
+        if fields is not None:
+            names = {field.strip() for field in fields.split(",")}
+            unknown = names - set(PEREVAL_FIELDS)
+            if unknown:
+                raise ValueError(f"Неизвестные поля: {', '.join(sorted(unknown))}")
+            requested = tuple(field for field in PEREVAL_FIELDS if field in names)
+        if not include_images:
+            requested = tuple(field for field in requested if field != "images")
+        after = _decode_cursor(cursor) if cursor else None
+
+        # Получить сводную версию перевалов пользователя одним агрегирующим запросом.
+        # ETag зависит от неё и от параметров запроса, т.к. они меняют содержимое ответа.
+        count, versions_sum, updated_at = await db_manager.get_perevals_version_on_email(session, user__email)
+        etag_source = f"{user__email}|{count}|{versions_sum}|{accept}|{sorted(request.query_params.multi_items())}"
+        headers = _validator_headers(f'"{hashlib.sha256(etag_source.encode()).hexdigest()[:32]}"', updated_at)
+        # Если у клиента актуальная версия списка, не загружать перевалы.
+        if count and _is_not_modified(headers, if_none_match, if_modified_since):
+            return Response(status_code=304, headers=headers)
+
+        # Если клиент запросил NDJSON, отдать перевалы потоком по одному в строке.
+        if accept and "application/x-ndjson" in accept:
+            user = await db_manager.get_user_on_email(session, user__email)
+            if not user:
+                raise HTTPException(
+                    status_code=404,
+                    detail="Пользователь с таким email не найден."
                 )
+            # Наличие копий изображений станет известно только во время отправки потока.
+            if image_format == "data" and image_variant != "original" and "images" in requested:
+                headers = _without_validators(headers)
+            return StreamingResponse(
+                _stream_perevals_ndjson(user, image_format, image_variant, requested, limit, after),
+                media_type="application/x-ndjson",
+                headers=headers
             )
-        return result_perevals
+
+        # Получить перевалы по запрашиваемому email.
+        # Загрузить на один перевал больше, чтобы узнать, есть ли следующая страница.
+        perevals = await db_manager.get_perevals_on_email(
+            session,
+            user__email,
+            limit=None if limit is None else limit + 1,
+            after=after,
+            **_projection(requested)
+        )
+        # Передать курсор следующей страницы в заголовке, чтобы не менять формат ответа.
+        if limit is not None and len(perevals) > limit:
+            perevals = perevals[:limit]
+            headers["X-Next-Cursor"] = _encode_cursor(perevals[-1])
+
+        # Преобразовать экземпляры PerevalAdded в Pydantic-схему и сериализовать список за один вызов.
+        fallbacks = []
+        result_perevals = [
+            await _pereval_to_schema(pereval, image_format, requested, image_variant, fallbacks)
+            for pereval in perevals
+        ]
+        if fallbacks:
+            headers = _without_validators(headers)
+        return json_response(_perevals_to_json(result_perevals, len(requested) != len(PEREVAL_FIELDS)), headers)
     # Обработать ошибки HTTP.
     except HTTPException as e:
         raise e
@@ -218,6 +840,79 @@ async def get_perevals_on_email(
                 "message": f"Ошибка валидации email: {e.errors()}"
             }
         )
+    # Обработать ошибки входных параметров.
+    except ValueError as e:
+        return JSONResponse(
+            status_code=400,
+            content={
+                "status": 400,
+                "message": str(e)
+            }
+        )
+    # Обработать все остальные ошибки.
+    except Exception as e:
+        logging.error(f"{e}", exc_info=True)
+        return JSONResponse(
+            status_code=500,
+            content={
+                "status": 500,
+                "message": str(e)
+            }
+        )
+
+
+# endpoint для синхронизации клиентов: перевалы, изменённые после курсора "since",
+# в порядке изменения. Выводятся принятые перевалы и все перевалы пользователя "user__email".
+# Без "since" выводятся все такие перевалы. Изменённый перевал выводится целиком,
+# изображения, убранные из перевалов, - в списке "removed_images" (могут повторяться, удалять повторно безопасно).
+# В ответе не больше "limit" перевалов и, как правило, не больше "limit" удалённых изображений.
+# Курсор для следующего запроса - "next_cursor"; если "has_more", изменения выданы не все.
+@router.get("/perevals/changes", response_model=PerevalChangesSchema)
+async def get_pereval_changes(
+        since: str | None = Query(None, description="Курсор next_cursor из предыдущего ответа"),
+        user__email: EmailStr | None = Query(None, alias="user__email", description="Email пользователя"),
+        image_format: Literal["data", "url"] = Query("url", description=ImageFormatQuery.description),
+        limit: int = Query(100, ge=1, le=1000, description="Максимальное количество перевалов в ответе"),
+        session: AsyncSession = Depends(get_async_session),
+):
+    # Создать экземпляр класса для работы с базой данной.
+    db_manager = DatabaseManager()
+    try:
+        after = _decode_change_cursor(since) if since else (0, 0)
+        user_id = None
+        if user__email is not None:
+            user = await db_manager.get_user_on_email(session, user__email)
+            user_id = user.id if user else None
+        perevals, tombstones, next_after, has_more = await db_manager.get_pereval_changes(
+            session, user_id, after, limit
+        )
+
+        changes = PerevalChangesSchema(
+            perevals=[
+                {
+                    "id": pereval.id,
+                    "version": pereval.version,
+                    "updated_at": pereval.updated_at,
+                    "pereval": await _pereval_to_schema(pereval, image_format),
+                }
+                for pereval in perevals
+            ],
+            removed_images=[
+                {"pereval_id": pereval_id, "image_id": image_id} for pereval_id, image_id in tombstones
+            ],
+            next_cursor=_encode_change_cursor(*next_after),
+            has_more=has_more,
+        )
+        return json_response(changes.model_dump_json().encode())
+    # Обработать ошибки входных параметров.
+    except ValueError as e:
+        return JSONResponse(
+            status_code=400,
+            content={
+                "status": 400,
+                "message": str(e)
+            }
+        )
     # Обработать все остальные ошибки.
     except Exception as e:
         logging.error(f"{e}", exc_info=True)
@@ -231,27 +926,44 @@ async def get_perevals_on_email(
 
 
 # endpoint, изменяющий данные о перевале по "id".
+# Если передан заголовок If-Match (ETag из GET /submit_data/{id}), перевал изменяется,
+# только если его версия не изменилась с момента чтения, иначе возвращается 412.
 @router.patch("/submit_data/{id}", response_model=PerevalReadSchema)
 async def patch_pereval_on_id(
         id: int,
         pereval: PerevalUpdateSchema,
+        if_match: str | None = Header(None),
         session: AsyncSession = Depends(get_async_session),
 ):
     # Создать экземпляр класса для работы с базой данной.
     db_manager = DatabaseManager()
     try:
+        # Получить версию перевала, которую видел клиент.
+        expected_version = _version_from_if_match(if_match, id)
         # Преобразовать Pydantic-схему в словарь.
         patch_pereval = pereval.model_dump(exclude_unset=True, by_alias=True)
         # Удалить поле "user", если оно было передано.
         patch_pereval.pop("user", None)
+        # Проверить новую область перевала.
+        await _check_area(session, patch_pereval)
         # Выполнить поиск перевала в базе данных.
-        # Получить код результата и сообщение.
+        # Получить код результата, сообщение и новую версию перевала.
         # Если код "1" - перевал найден и изменён. Сообщение "None".
         # Если код "0" - перевал не найден или не обновлён. Сообщение с причиной ошибки.
-        state, message = await db_manager.patch_pereval_on_id(session, id, patch_pereval)
+        state, message, version = await db_manager.patch_pereval_on_id(
+            session, id, patch_pereval, expected_version
+        )
         return JSONResponse(
             status_code=200 if state else 400,
-            content={"state": state, "message": message}
+            content={"state": state, "message": message},
+            # Передать ETag новой версии, чтобы клиент мог изменить перевал ещё раз без GET.
+            headers={"ETag": f'"{id}-{version}-data-original"'} if state else None
+        )
+    # Обработать несовпадение версии перевала и некорректный If-Match.
+    except HTTPException as e:
+        return JSONResponse(
+            status_code=e.status_code,
+            content={"state": 0, "message": e.detail}
         )
     # Обработать ошибку валидации.
     except ValidationError as e:
@@ -0,0 +1,95 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, Header
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.endpoints.pereval import get_async_session, json_response, etag_matches
+from app.api.schemas.pereval import AreaReferenceSchema, ActivityTypeSchema, ACTIVITY_TYPE_LIST_ADAPTER
+from app.core.areas import area_reference
+from app.core.config import settings
+from app.core.reference import ReferenceData
+from app.db.repositories.pereval import DatabaseManager
+
+
+router = APIRouter()
+
+
+# Загрузить справочник видов спорта из базы данных.
+async def _load_activities_types(session: AsyncSession) -> list:
+    return await DatabaseManager().get_activities_types(session)
+
+
+# Сериализовать справочник видов спорта в JSON.
+def _dump_activities_types(rows: list) -> bytes:
+    items = ACTIVITY_TYPE_LIST_ADAPTER.validate_python(
+        [{"id": activity_id, "title": title} for activity_id, title in rows]
+    )
+    return ACTIVITY_TYPE_LIST_ADAPTER.dump_json(items)
+
+
+# Справочники, хранящиеся в памяти процесса.
+# Справочник областей общий с деревом областей GET /areas.
+REFERENCES = {
+    "pereval_areas": area_reference,
+    "spr_activities_types": ReferenceData("spr_activities_types", _load_activities_types, _dump_activities_types),
+}
+
+
+# Функция, отдающая справочник из памяти процесса.
+# Справочники меняются редко, поэтому клиенты могут кешировать их на REFERENCE_MAX_AGE секунд,
+# а затем перепроверить по ETag и получить "304 Not Modified".
+async def _reference_response(name: str, session: AsyncSession, if_none_match: str | None) -> Response:
+    try:
+        snapshot = await REFERENCES[name].get(session)
+    # Обработать ошибки загрузки справочника, если его ещё нет в памяти.
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={
+                "status": 500,
+                "message": f"Ошибка подключения к базе данных: {e}"
+            }
+        )
+    headers = {
+        "ETag": snapshot.etag,
+        "Cache-Control": f"public, max-age={settings.REFERENCE_MAX_AGE}",
+    }
+    if etag_matches(if_none_match, snapshot.etag):
+        return Response(status_code=304, headers=headers)
+    return json_response(snapshot.body, headers)
+
+
+# endpoint, отдающий справочник областей перевалов.
+@router.get("/reference/pereval_areas", response_model=List[AreaReferenceSchema])
+async def get_pereval_areas(
+        if_none_match: str | None = Header(None),
+        session: AsyncSession = Depends(get_async_session),
+):
+    return await _reference_response("pereval_areas", session, if_none_match)
+
+
+# endpoint, отдающий справочник видов спорта на перевалах.
+@router.get("/reference/spr_activities_types", response_model=List[ActivityTypeSchema])
+async def get_activities_types(
+        if_none_match: str | None = Header(None),
+        session: AsyncSession = Depends(get_async_session),
+):
+    return await _reference_response("spr_activities_types", session, if_none_match)
+
+
+# endpoint, сбрасывающий справочники в памяти процесса после их изменения в базе данных.
+# Следующий запрос загрузит справочники заново. Другие процессы обновят их по истечении
+# REFERENCE_REFRESH_INTERVAL секунд.
+@router.post("/reference/invalidate")
+async def invalidate_references():
+    # Дерево областей строится по снимку справочника областей и сбрасывается вместе с ним.
+    for reference in REFERENCES.values():
+        reference.invalidate()
+    return JSONResponse(
+        status_code=200,
+        content={
+            "status": 200,
+            "message": None
+        }
+    )
@@ -0,0 +1,142 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.endpoints.pereval import get_async_session, json_response
+from app.api.schemas.pereval import PerevalSearchItemSchema, PEREVAL_SEARCH_LIST_ADAPTER
+from app.db.repositories.pereval import DatabaseManager
+
+
+router = APIRouter()
+
+
+# Функция, разбирающая строку из нескольких чисел через запятую.
+# Если чисел не столько, сколько нужно, вызвать "ValueError".
+def _parse_floats(value: str, count: int, name: str) -> list[float]:
+    try:
+        numbers = [float(number) for number in value.split(",")]
+    except ValueError:
+        numbers = []
+    if len(numbers) != count:
+        raise ValueError(f"Параметр {name} должен содержать {count} числа через запятую.")
+    return numbers
+
+
+# Функция, проверяющая широту и долготу.
+def _check_lat_lon(lat: float, lon: float) -> None:
+    if not -90 <= lat <= 90 or not -180 <= lon <= 180:
+        raise ValueError("Широта должна быть в диапазоне [-90, 90], долгота - в диапазоне [-180, 180].")
+
+
+# Функция, сериализующая строки результата поиска в JSON.
+# Строки проверяются один раз и сериализуются списком за один вызов.
+def _rows_to_json(rows) -> bytes:
+    items = PEREVAL_SEARCH_LIST_ADAPTER.validate_python([
+        {
+            "id": row["id"],
+            "beauty_title": row["beauty_title"],
+            "title": row["title"],
+            "status": row["status"],
+            "coords": {"latitude": row["latitude"], "longitude": row["longitude"], "height": row["height"]},
+            "distance_km": row.get("distance_km"),
+            "rank": row.get("rank"),
+        }
+        for row in rows
+    ])
+    return PEREVAL_SEARCH_LIST_ADAPTER.dump_json(items)
+
+
+# endpoint, ищущий перевалы по координатам:
+# в прямоугольной области (bbox=min_lon,min_lat,max_lon,max_lat)
+# или в радиусе от точки (near=lat,lon&radius_km=...), в порядке удалённости.
+@router.get("/perevals/search", response_model=List[PerevalSearchItemSchema])
+async def search_perevals(
+        bbox: str | None = Query(None, description="Область: min_lon,min_lat,max_lon,max_lat"),
+        near: str | None = Query(None, description="Центр поиска: lat,lon"),
+        radius_km: float | None = Query(None, gt=0, le=20000, description="Радиус поиска в километрах"),
+        limit: int = Query(100, ge=1, le=1000, description="Максимальное количество перевалов"),
+        session: AsyncSession = Depends(get_async_session),
+):
+    # Создать экземпляр класса для работы с базой данной.
+    db_manager = DatabaseManager()
+    try:
+        if (bbox is None) == (near is None):
+            raise ValueError("Укажите ровно один из параметров: bbox или near.")
+        if bbox is not None:
+            min_lon, min_lat, max_lon, max_lat = _parse_floats(bbox, 4, "bbox")
+            _check_lat_lon(min_lat, min_lon)
+            _check_lat_lon(max_lat, max_lon)
+            if min_lat > max_lat:
+                raise ValueError("min_lat не может быть больше max_lat.")
+            rows = await db_manager.search_perevals_in_bbox(session, min_lat, min_lon, max_lat, max_lon, limit)
+        else:
+            if radius_km is None:
+                raise ValueError("Для поиска по параметру near укажите radius_km.")
+            lat, lon = _parse_floats(near, 2, "near")
+            _check_lat_lon(lat, lon)
+            rows = await db_manager.search_perevals_near(session, lat, lon, radius_km, limit)
+
+        return json_response(_rows_to_json(rows))
+    # Обработать ошибки входных параметров.
+    except ValueError as e:
+        return JSONResponse(
+            status_code=400,
+            content={
+                "status": 400,
+                "message": str(e)
+            }
+        )
+    # Обработать все остальные ошибки.
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={
+                "status": 500,
+                "message": str(e)
+            }
+        )
+
+
+# endpoint, ищущий перевалы по названиям (title, other_titles, connect) с учётом опечаток.
+# Последнее слово запроса ищется как начало слова. Результат отсортирован по релевантности.
+# Если есть следующая страница, её смещение передаётся в заголовке "X-Next-Offset".
+@router.get("/perevals/search/text", response_model=List[PerevalSearchItemSchema])
+async def search_perevals_by_text(
+        q: str = Query(..., max_length=200, description="Поисковый запрос"),
+        limit: int = Query(20, ge=1, le=100, description="Количество перевалов на странице"),
+        offset: int = Query(0, ge=0, le=10000, description="Смещение от начала результата"),
+        session: AsyncSession = Depends(get_async_session),
+):
+    # Создать экземпляр класса для работы с базой данной.
+    db_manager = DatabaseManager()
+    try:
+        query = q.strip()
+        if not query:
+            raise ValueError("Поисковый запрос не может быть пустым.")
+        # Запросить на одну строку больше, чтобы узнать, есть ли следующая страница.
+        rows = await db_manager.search_perevals_by_text(session, query, limit + 1, offset)
+        headers = {}
+        if len(rows) > limit:
+            rows = rows[:limit]
+            headers["X-Next-Offset"] = str(offset + limit)
+        return json_response(_rows_to_json(rows), headers)
+    # Обработать ошибки входных параметров.
+    except ValueError as e:
+        return JSONResponse(
+            status_code=400,
+            content={
+                "status": 400,
+                "message": str(e)
+            }
+        )
+    # Обработать все остальные ошибки.
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={
+                "status": 500,
+                "message": str(e)
+            }
+        )
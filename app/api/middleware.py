@@ -0,0 +1,100 @@
+import logging
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.metrics import HTTP_REQUEST_DURATION, HTTP_RESPONSE_SIZE, HTTP_REQUESTS_IN_FLIGHT
+from app.db.instrumentation import RequestQueryStats, request_query_stats
+
+
+# ASGI-middleware, собирающее метрики HTTP-запросов:
+# время обработки и размер ответа по шаблону маршрута, количество обрабатываемых запросов.
+# Время считается до отправки последней части тела, поэтому учитывает и потоковые ответы.
+class MetricsMiddleware:
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        started = time.perf_counter()
+        status_code = 500
+        response_size = 0
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, response_size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                response_size += len(message.get("body", b""))
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc(method=method)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec(method=method)
+            # Маршрут известен только после обработки запроса роутером.
+            # Для ненайденных путей использовать общую метку, чтобы не плодить метрики.
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - started, method=method, route=route_path, status=status_code
+            )
+            HTTP_RESPONSE_SIZE.observe(response_size, method=method, route=route_path)
+
+
+# ASGI-middleware, считающее запросы к базе данных в каждом HTTP-запросе.
+# Добавляет в ответ заголовок Server-Timing с количеством и временем запросов
+# и пишет предупреждение в лог, если превышен бюджет запросов или найден вероятный N+1
+# (один и тот же запрос выполнен много раз). Подключается настройкой SQL_INSTRUMENTATION.
+class QueryCountingMiddleware:
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        stats = RequestQueryStats()
+        token = request_query_stats.set(stats)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing",
+                    f'db;dur={stats.duration * 1000:.2f};desc="{stats.count} queries", '
+                    f'total;dur={(time.perf_counter() - started) * 1000:.2f}'
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_query_stats.reset(token)
+            self._check_budget(scope, stats)
+
+    # Записать в лог предупреждения о превышении бюджета запросов и о повторяющихся запросах.
+    @staticmethod
+    def _check_budget(scope: Scope, stats: RequestQueryStats) -> None:
+        request = f"{scope['method']} {scope['path']}"
+        if stats.count > settings.SQL_QUERY_BUDGET:
+            logging.warning(
+                f"{request}: {stats.count} запросов к базе данных за {stats.duration * 1000:.1f} мс "
+                f"(бюджет {settings.SQL_QUERY_BUDGET})."
+            )
+        for statement, count in stats.statements.items():
+            if count >= settings.SQL_REPEATED_QUERY_LIMIT:
+                logging.warning(
+                    f"{request}: запрос выполнен {count} раз, вероятно N+1: {' '.join(statement.split())[:200]}"
+                )
@@ -1,7 +1,7 @@
 from datetime import datetime
 from enum import IntEnum
 from typing import List
-from pydantic import BaseModel, EmailStr, field_serializer, ConfigDict
+from pydantic import BaseModel, EmailStr, field_serializer, ConfigDict, TypeAdapter, Field
 
 
 # Класс для валидации данных пользователя.
@@ -40,6 +40,18 @@ class ImageSchema(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+# Класс для вывода ссылки на изображение вместо его содержимого.
+# Само изображение отдаётся методом GET /images/{id}.
+class ImageLinkSchema(BaseModel):
+    id: int
+    title: str
+    url: str
+    size: int
+    mime_type: str
+    # Параметр для автоматического преобразования ORM в Pydantic.
+    model_config = ConfigDict(from_attributes=True)
+
+
 # Класс для валидации входных данных, получаемых при создании перевала.
 # Данные по ключам "beauty_title", "title", "other_titles",
 # "connect, "add_time" проверяются напрямую.
@@ -55,6 +67,8 @@ class PerevalCreateSchema(BaseModel):
     coords: CoordSchema
     level: LevelSchema
     images: List[ImageSchema]
+    # Область перевала из справочника "pereval_areas" (GET /areas).
+    area_id: int | None = None
 
 
 # Класс для преобразования числовых статусов в удобные для восприятия пользователем.
@@ -83,11 +97,13 @@ class PerevalReadSchema(BaseModel):
     add_time: datetime
     user: UserSchema
     coords: CoordSchema
+    area_id: int | None = None
     level_winter: str | None = None
     level_summer: str | None = None
     level_autumn: str | None = None
     level_spring: str | None = None
-    images: List[ImageSchema]
+    # Изображения в base64 или ссылки на них, в зависимости от параметра запроса "image_format".
+    images: List[ImageSchema | ImageLinkSchema]
 
     # Параметр для автоматического преобразования ORM в Pydantic.
     model_config = ConfigDict(from_attributes=True)
@@ -98,6 +114,36 @@ class PerevalReadSchema(BaseModel):
         return str(status)
 
 
+# Класс для вывода части полей перевала, выбранных параметром запроса "fields".
+# Все поля необязательные, в ответ попадают только заданные.
+class PerevalPartialReadSchema(PerevalReadSchema):
+    status: StatusPerevalEnum | None = None
+    beauty_title: str | None = None
+    title: str | None = None
+    add_time: datetime | None = None
+    user: UserSchema | None = None
+    coords: CoordSchema | None = None
+    images: List[ImageSchema | ImageLinkSchema] | None = None
+
+
+# Класс для вывода перевала в результатах поиска: только данные, нужные для карты и списка.
+class PerevalSearchItemSchema(BaseModel):
+    id: int
+    beauty_title: str
+    title: str
+    status: StatusPerevalEnum
+    coords: CoordSchema
+    # Расстояние до точки поиска, только для поиска в радиусе.
+    distance_km: float | None = None
+    # Релевантность, только для поиска по названию.
+    rank: float | None = None
+
+    # Метод для преобразования числовых статусов в удобные для восприятия пользователем.
+    @field_serializer("status")
+    def serialize_status(self, status):
+        return str(status)
+
+
 # Класс для валидации входных данных, получаемых при изменении информации о перевале.
 class PerevalUpdateSchema(PerevalCreateSchema):
     # Запретить поля неуказанные в этом классе.
@@ -114,4 +160,93 @@ class PerevalUpdateSchema(PerevalCreateSchema):
     add_time: datetime | None = None
     coords: CoordSchema | None = None
     level: LevelSchema | None = None
-    images: list[ImageSchema] | None = None
\ No newline at end of file
+    images: list[ImageSchema] | None = None
+
+
+# Класс для валидации списка "id" перевалов в запросах модерации.
+class ModerationIdsSchema(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=1000)
+
+
+# Класс для вывода перевала, забранного на модерацию.
+class ModerationPerevalSchema(BaseModel):
+    id: int
+    beauty_title: str
+    title: str
+    add_time: datetime
+    version: int
+
+
+# Класс для вывода области перевалов в дереве областей.
+class AreaSchema(BaseModel):
+    id: int
+    # "id" родительской области, у корневых областей - "None".
+    id_parent: int | None
+    title: str
+    # Глубина области в дереве, у корневых областей - 0.
+    depth: int
+    # Количество перевалов в самой области и вместе со всеми подобластями.
+    perevals_count: int
+    perevals_total: int
+
+
+# Класс для вывода перевала в списке перевалов области.
+class AreaPerevalSchema(BaseModel):
+    id: int
+    beauty_title: str
+    title: str
+    status: StatusPerevalEnum
+    coords: CoordSchema
+    area_id: int
+
+    # Метод для преобразования числовых статусов в удобные для восприятия пользователем.
+    @field_serializer("status")
+    def serialize_status(self, status):
+        return str(status)
+
+
+# Класс для вывода области перевалов в справочнике областей.
+class AreaReferenceSchema(BaseModel):
+    id: int
+    id_parent: int
+    title: str
+
+
+# Класс для вывода вида спорта в справочнике видов спорта.
+class ActivityTypeSchema(BaseModel):
+    id: int
+    title: str
+
+
+# Класс для вывода изменённого перевала в ответе GET /perevals/changes.
+class PerevalChangeSchema(BaseModel):
+    id: int
+    version: int
+    updated_at: datetime
+    pereval: PerevalReadSchema
+
+
+# Класс для вывода изображения, удалённого из перевала.
+class RemovedImageSchema(BaseModel):
+    pereval_id: int
+    image_id: int
+
+
+# Класс для вывода изменений перевалов после курсора.
+class PerevalChangesSchema(BaseModel):
+    perevals: List[PerevalChangeSchema]
+    removed_images: List[RemovedImageSchema]
+    # Курсор для следующего запроса и признак того, что изменения выданы не все.
+    next_cursor: str
+    has_more: bool
+
+
+# Адаптеры для сериализации списков уже проверенных схем сразу в JSON.
+# Создаются один раз при импорте, чтобы не строить схему сериализации в каждом запросе.
+PEREVAL_LIST_ADAPTER = TypeAdapter(List[PerevalReadSchema])
+PEREVAL_PARTIAL_LIST_ADAPTER = TypeAdapter(List[PerevalPartialReadSchema])
+PEREVAL_SEARCH_LIST_ADAPTER = TypeAdapter(List[PerevalSearchItemSchema])
+AREA_LIST_ADAPTER = TypeAdapter(List[AreaSchema])
+AREA_PEREVAL_LIST_ADAPTER = TypeAdapter(List[AreaPerevalSchema])
+AREA_REFERENCE_LIST_ADAPTER = TypeAdapter(List[AreaReferenceSchema])
+ACTIVITY_TYPE_LIST_ADAPTER = TypeAdapter(List[ActivityTypeSchema])
@@ -0,0 +1,94 @@
+import math
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.schemas.pereval import AREA_REFERENCE_LIST_ADAPTER
+from app.core.config import settings
+from app.core.reference import ReferenceData, ReferenceSnapshot
+from app.db.repositories.pereval import DatabaseManager
+
+
+# Дерево областей перевалов из таблицы "pereval_areas".
+# Корневые области ссылаются в "id_parent" на себя или на несуществующую область (например, 0).
+class AreaTree:
+
+    def __init__(self, rows: list[tuple[int, int, str]]):
+        self.titles: dict[int, str] = {area_id: title for area_id, _, title in rows}
+        self.parents: dict[int, int] = {}
+        self.children: dict[int, list[int]] = {area_id: [] for area_id in self.titles}
+        for area_id, id_parent, _ in sorted(rows):
+            if id_parent != area_id and id_parent in self.titles:
+                self.parents[area_id] = id_parent
+                self.children[id_parent].append(area_id)
+        self.roots = [area_id for area_id in sorted(self.titles) if area_id not in self.parents]
+
+    def __contains__(self, area_id: int) -> bool:
+        return area_id in self.titles
+
+    # Обход дерева в глубину: пары ("id", глубина), каждая область после своего родителя.
+    # Области, зацикленные через "id_parent", недостижимы от корней и не выводятся.
+    def walk(self) -> list[tuple[int, int]]:
+        result = []
+        stack = [(area_id, 0) for area_id in reversed(self.roots)]
+        while stack:
+            area_id, depth = stack.pop()
+            result.append((area_id, depth))
+            stack.extend((child_id, depth + 1) for child_id in reversed(self.children[area_id]))
+        return result
+
+    # Сложить количество перевалов областей по поддеревьям:
+    # для каждой области - перевалы самой области и всех её подобластей.
+    def subtree_totals(self, counts: dict[int, int]) -> dict[int, int]:
+        totals = {}
+        for area_id, _ in reversed(self.walk()):
+            totals[area_id] = counts.get(area_id, 0) + sum(totals[child_id] for child_id in self.children[area_id])
+        return totals
+
+
+# Загрузить справочник областей перевалов из базы данных.
+async def _load_areas(session: AsyncSession) -> list:
+    return await DatabaseManager().get_pereval_areas(session)
+
+
+# Сериализовать справочник областей перевалов в JSON (GET /reference/pereval_areas).
+def _dump_areas(rows: list) -> bytes:
+    items = AREA_REFERENCE_LIST_ADAPTER.validate_python(
+        [{"id": area_id, "id_parent": id_parent, "title": title} for area_id, id_parent, title in rows]
+    )
+    return AREA_REFERENCE_LIST_ADAPTER.dump_json(items)
+
+
+# Справочник областей перевалов в памяти процесса. Из одного его снимка строятся и ответ
+# GET /reference/pereval_areas, и дерево областей, поэтому они обновляются и сбрасываются вместе.
+area_reference = ReferenceData("pereval_areas", _load_areas, _dump_areas)
+
+# Дерево областей и снимок справочника, по которому оно построено.
+_tree: AreaTree | None = None
+_tree_snapshot: ReferenceSnapshot | None = None
+# Время последней перезагрузки справочника из-за неизвестной области.
+_missed_at = -math.inf
+
+
+# Получить дерево областей. Дерево перестраивается, только когда снимок справочника областей обновился.
+async def get_area_tree(session: AsyncSession) -> AreaTree:
+    global _tree, _tree_snapshot
+    snapshot = await area_reference.get(session)
+    if snapshot is not _tree_snapshot:
+        _tree = AreaTree(snapshot.rows)
+        _tree_snapshot = snapshot
+    return _tree
+
+
+# Проверить, что область есть в дереве. Неизвестная область могла быть добавлена после загрузки справочника,
+# поэтому справочник перезагружается, но не чаще раза в AREA_RELOAD_INTERVAL секунд:
+# запросы с несуществующими областями не должны перечитывать его из базы данных каждый раз.
+async def has_area(session: AsyncSession, area_id: int) -> bool:
+    global _missed_at
+    if area_id in await get_area_tree(session):
+        return True
+    if time.monotonic() - _missed_at < settings.AREA_RELOAD_INTERVAL:
+        return False
+    _missed_at = time.monotonic()
+    area_reference.invalidate()
+    return area_id in await get_area_tree(session)
@@ -0,0 +1,189 @@
+import logging
+import time
+from collections import OrderedDict
+
+from app.core.config import settings
+from app.storage.image_variants import IMAGE_VARIANT_NAMES
+
+
+# Ограниченный LRU-кеш в памяти процесса.
+# Ограничен количеством записей, суммарным размером значений в байтах и временем жизни записи.
+class LRUCache:
+
+    def __init__(self, max_items: int, max_bytes: int, ttl: float):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._items: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._bytes = 0
+
+    def get(self, key: str) -> bytes | None:
+        item = self._items.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            self.delete(key)
+            return None
+        self._items.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: bytes) -> None:
+        # Значение больше всего кеша не сохранять, чтобы не вытеснить все остальные записи.
+        if len(value) > self.max_bytes:
+            return
+        self.delete(key)
+        self._items[key] = (time.monotonic() + self.ttl, value)
+        self._bytes += len(value)
+        # Вытеснить самые давно использованные записи.
+        while len(self._items) > self.max_items or self._bytes > self.max_bytes:
+            _, (_, old_value) = self._items.popitem(last=False)
+            self._bytes -= len(old_value)
+
+    def delete(self, key: str) -> None:
+        item = self._items.pop(key, None)
+        if item is not None:
+            self._bytes -= len(item[1])
+
+    def clear(self) -> None:
+        self._items.clear()
+        self._bytes = 0
+
+
+# Общий для всех процессов кеш в Redis.
+# Принимает любой клиент с асинхронными методами get, set(ex=) и delete,
+# например redis.asyncio.Redis или локальную заглушку с тем же интерфейсом.
+# Ошибки Redis не должны ломать запросы, поэтому они только логируются.
+class RedisCache:
+
+    def __init__(self, client, ttl: float, prefix: str = "fstr:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    async def get(self, key: str) -> bytes | None:
+        try:
+            return await self.client.get(self.prefix + key)
+        except Exception as e:
+            logging.warning(f"Ошибка чтения из Redis: {e}")
+            return None
+
+    async def set(self, key: str, value: bytes) -> None:
+        try:
+            await self.client.set(self.prefix + key, value, ex=max(int(self.ttl), 1))
+        except Exception as e:
+            logging.warning(f"Ошибка записи в Redis: {e}")
+
+    async def delete(self, *keys: str) -> None:
+        try:
+            await self.client.delete(*(self.prefix + key for key in keys))
+        except Exception as e:
+            logging.warning(f"Ошибка удаления из Redis: {e}")
+
+
+# Кеш готовых (сериализованных) ответов.
+# Сначала проверяется локальный LRU-кеш, затем общий кеш в Redis, если он настроен.
+# Локальные записи других процессов при инвалидации не удаляются и живут не дольше CACHE_TTL,
+# но не используются, т.к. ключи содержат версию записи.
+class ResponseCache:
+
+    def __init__(self, local: LRUCache, shared: RedisCache | None = None, enabled: bool = True):
+        self.local = local
+        self.shared = shared
+        self.enabled = enabled
+
+    async def get(self, key: str) -> bytes | None:
+        if not self.enabled:
+            return None
+        value = self.local.get(key)
+        if value is None and self.shared is not None:
+            value = await self.shared.get(key)
+            if value is not None:
+                self.local.set(key, value)
+        return value
+
+    async def set(self, key: str, value: bytes) -> None:
+        if not self.enabled:
+            return
+        self.local.set(key, value)
+        if self.shared is not None:
+            await self.shared.set(key, value)
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self.local.delete(key)
+        if self.shared is not None and keys:
+            await self.shared.delete(*keys)
+
+
+# Варианты вывода изображений, для каждого из которых кешируется свой ответ.
+PEREVAL_IMAGE_FORMATS = ("data", "url")
+
+
+# Ключ кеша ответа GET /submit_data/{id}.
+# Версия перевала входит в ключ, поэтому после изменения перевала старый ответ
+# не будет найден ни в одном процессе, даже если его локальная запись ещё не истекла.
+def pereval_cache_key(pereval_id: int, version: int, image_format: str, image_variant: str = "original") -> str:
+    return f"pereval:{pereval_id}:{version}:{image_format}:{image_variant}"
+
+
+# Удалить из кеша ответы о перевале с указанной (устаревшей) версией.
+# Вызывается при любом изменении перевала, в том числе при смене статуса.
+async def invalidate_pereval(pereval_id: int, version: int) -> None:
+    await pereval_cache.delete(*(
+        pereval_cache_key(pereval_id, version, image_format, image_variant)
+        for image_format in PEREVAL_IMAGE_FORMATS
+        for image_variant in IMAGE_VARIANT_NAMES
+    ))
+
+
+# Создать кеш ответов о перевалах по настройкам приложения.
+def create_pereval_cache() -> ResponseCache:
+    local = LRUCache(settings.CACHE_MAX_ITEMS, settings.CACHE_MAX_BYTES, settings.CACHE_TTL)
+    shared = None
+    if settings.CACHE_REDIS_URL:
+        # Пакет redis нужен только для общего кеша, поэтому импортируется здесь.
+        try:
+            from redis.asyncio import Redis
+        except ImportError:
+            raise RuntimeError("Для CACHE_REDIS_URL установите пакет redis.")
+        shared = RedisCache(Redis.from_url(settings.CACHE_REDIS_URL), settings.CACHE_TTL)
+    return ResponseCache(local, shared, enabled=settings.CACHE_ENABLED)
+
+
+# Сохранить кеш ответов о перевалах в переменную.
+pereval_cache = create_pereval_cache()
+
+
+# Ограниченный LRU-кеш "email - id пользователя" в памяти процесса.
+# "id" пользователя с данным email не меняется, пока существует строка пользователя,
+# поэтому у записей нет времени жизни. При удалении пользователя или смене его email
+# запись нужно удалить методом discard.
+class UserIdCache:
+
+    def __init__(self, max_items: int):
+        self.max_items = max_items
+        self._items: OrderedDict[str, int] = OrderedDict()
+
+    def get(self, email: str) -> int | None:
+        user_id = self._items.get(email)
+        if user_id is not None:
+            self._items.move_to_end(email)
+        return user_id
+
+    def set(self, email: str, user_id: int) -> None:
+        if self.max_items <= 0:
+            return
+        self._items[email] = user_id
+        self._items.move_to_end(email)
+        # Вытеснить самые давно использованные записи.
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+
+    def discard(self, *emails: str) -> None:
+        for email in emails:
+            self._items.pop(email, None)
+
+
+# Сохранить кеш "id" пользователей в переменную.
+user_id_cache = UserIdCache(settings.USER_ID_CACHE_SIZE)
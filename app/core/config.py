@@ -16,12 +16,112 @@ class Settings(BaseSettings):
     FSTR_DB_PASS: str
     FSTR_DB_NAME: str
 
+    # Настройки пула соединений с базой данных.
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    # Время ожидания свободного соединения (секунды).
+    DB_POOL_TIMEOUT: float = 30
+    # Время жизни соединения (секунды), после которого оно пересоздаётся. -1 - без ограничения.
+    DB_POOL_RECYCLE: int = 1800
+    # Проверять соединение перед выдачей из пула.
+    DB_POOL_PRE_PING: bool = True
+    # Ограничение времени выполнения запроса на стороне PostgreSQL (миллисекунды). None - без ограничения.
+    DB_STATEMENT_TIMEOUT_MS: int | None = None
+    # Завершать сессии, простаивающие внутри транзакции дольше этого времени (миллисекунды). None - без ограничения.
+    # Такая сессия держит xmin снимка всего кластера, и GET /perevals/changes не выдаёт изменения новее него.
+    DB_IDLE_IN_TRANSACTION_TIMEOUT_MS: int | None = 300000
+    # Размер кеша подготовленных запросов asyncpg на соединение. 0 - отключить (например, для pgbouncer).
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 100
+
+    # Настройки хранилища изображений: "local" (файловая система) или "s3".
+    BLOB_STORAGE_BACKEND: str = "local"
+    BLOB_STORAGE_PATH: str = "media/blobs"
+    # Настройки S3-совместимого хранилища (AWS S3, MinIO и т.п.).
+    S3_BUCKET: str | None = None
+    S3_PREFIX: str = ""
+    S3_ENDPOINT_URL: str | None = None
+    S3_REGION: str | None = None
+    S3_ACCESS_KEY: str | None = None
+    S3_SECRET_KEY: str | None = None
+
+    # Настройки кеша ответов GET /submit_data/{id}.
+    # Размер локального кеша ограничен количеством записей и суммарным объёмом в байтах.
+    CACHE_ENABLED: bool = True
+    CACHE_MAX_ITEMS: int = 1024
+    CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    CACHE_TTL: int = 300
+    # Адрес Redis для общего кеша всех процессов, например redis://localhost:6379/0.
+    CACHE_REDIS_URL: str | None = None
+    # Размер кеша "email - id пользователя" при добавлении перевалов. 0 - отключить.
+    USER_ID_CACHE_SIZE: int = 10000
+
+    # Максимальный размер одного изображения в байтах (в base64 и в multipart-запросе).
+    MAX_IMAGE_SIZE: int = 20 * 1024 * 1024
+
+    # Максимальный размер всего тела запроса POST /submit_data/multipart в байтах.
+    # Проверяется по Content-Length и при приёме запроса, до разбора полей и сохранения файлов.
+    MAX_MULTIPART_SIZE: int = 100 * 1024 * 1024
+
+    # Уменьшенные копии изображений (thumb, medium) создаются обработчиком очереди задач в пуле процессов.
+    # Нужен пакет Pillow; без него отдаются только исходные изображения.
+    IMAGE_VARIANTS_ENABLED: bool = True
+    IMAGE_WORKERS: int = 2
+    IMAGE_VARIANT_QUALITY: int = 80
+
+    # Справочники (GET /reference/...): через сколько секунд перечитывать их из базы данных
+    # и сколько секунд клиенты могут кешировать ответ (заголовок Cache-Control).
+    # Дерево областей перевалов строится по справочнику областей и обновляется вместе с ним.
+    REFERENCE_REFRESH_INTERVAL: float = 3600
+    REFERENCE_MAX_AGE: int = 86400
+    # Если области нет в дереве, справочник областей перезагружается (область могла быть только что добавлена),
+    # но не чаще, чем раз в это количество секунд.
+    AREA_RELOAD_INTERVAL: float = 60
+
+    # Очередь фоновых задач (python -m app.jobs.worker): сколько задач забирать за раз,
+    # как часто проверять очередь (секунды), через сколько секунд считать задачу зависшей
+    # и начальная задержка повтора после ошибки (удваивается с каждой попыткой).
+    JOB_BATCH_SIZE: int = 10
+    JOB_POLL_INTERVAL: float = 1.0
+    JOB_LOCK_TIMEOUT: float = 300
+    JOB_RETRY_DELAY: float = 5
+    # Через сколько секунд после создания удалять выполненные и невыполненные задачи
+    # и как часто (в секундах) обработчик очереди проверяет, есть ли такие задачи.
+    JOB_RETENTION: float = 7 * 24 * 3600
+    JOB_CLEANUP_INTERVAL: float = 3600
+    # Адрес, на который POST-запросом отправляется уведомление о новом перевале (JSON).
+    # None - уведомление только пишется в лог.
+    NOTIFY_WEBHOOK_URL: str | None = None
+    NOTIFY_WEBHOOK_TIMEOUT: float = 10
+
+    # Подсчёт запросов к базе данных в каждом HTTP-запросе (для отладки и staging).
+    # Добавляет заголовок Server-Timing и пишет предупреждение в лог,
+    # если запросов больше SQL_QUERY_BUDGET или один запрос повторяется SQL_REPEATED_QUERY_LIMIT раз (N+1).
+    SQL_INSTRUMENTATION: bool = False
+    SQL_QUERY_BUDGET: int = 10
+    SQL_REPEATED_QUERY_LIMIT: int = 5
+
     # Создать свойство, генерирующее ссылку для подключения к базе данных.
     @property
     def async_database_url(self):
         return (f"postgresql+asyncpg://{self.FSTR_DB_LOGIN}:{self.FSTR_DB_PASS}"
                 f"@{self.FSTR_DB_HOST}:{self.FSTR_DB_PORT}/{self.FSTR_DB_NAME}")
 
+    # Создать свойство с параметрами подключения для драйвера asyncpg.
+    @property
+    def db_connect_args(self) -> dict:
+        connect_args = {
+            "prepared_statement_cache_size": self.DB_PREPARED_STATEMENT_CACHE_SIZE,
+            "statement_cache_size": self.DB_PREPARED_STATEMENT_CACHE_SIZE,
+        }
+        server_settings = {}
+        if self.DB_STATEMENT_TIMEOUT_MS is not None:
+            server_settings["statement_timeout"] = str(self.DB_STATEMENT_TIMEOUT_MS)
+        if self.DB_IDLE_IN_TRANSACTION_TIMEOUT_MS is not None:
+            server_settings["idle_in_transaction_session_timeout"] = str(self.DB_IDLE_IN_TRANSACTION_TIMEOUT_MS)
+        if server_settings:
+            connect_args["server_settings"] = server_settings
+        return connect_args
+
 
 # Сохранить настройки проекта в переменную.
 settings = Settings()
@@ -0,0 +1,159 @@
+import math
+from typing import Callable, Iterable
+
+
+# Границы корзин гистограмм по умолчанию (секунды).
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Границы корзин для размеров (байты).
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+# Экранировать значение метки по правилам текстового формата Prometheus.
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+# Сформировать строку меток вида {name="value",...}.
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+# Базовый класс метрики с набором меток.
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+
+
+# Счётчик: значение только растёт.
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, value: float = 1, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + value
+
+    def samples(self) -> list[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in self._values.items()]
+
+
+# Измеритель: значение может расти и убывать.
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, value: float = 1, **labels) -> None:
+        self.inc(-value, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        self._values[self._key(labels)] = value
+
+
+# Гистограмма: распределение значений по корзинам, сумма и количество наблюдений.
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = (*sorted(buckets), math.inf)
+        # Для каждого набора меток: [количество по корзинам, сумма, количество].
+        self._values: dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                state[0][i] += 1
+                break
+        state[1] += value
+        state[2] += 1
+
+    def samples(self) -> list[str]:
+        lines = []
+        for key, (bucket_counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == math.inf else repr(bound)
+                labels = _format_labels((*self.labelnames, "le"), (*key, le))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+# Реестр метрик, формирующий ответ в текстовом формате Prometheus.
+# Кроме зарегистрированных метрик, вызывает функции-сборщики,
+# которые возвращают готовые строки (например, состояние пула соединений).
+class Registry:
+
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+        self._collectors: list[Callable[[], list[str]]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], list[str]]) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+# Сохранить реестр метрик приложения в переменную.
+registry = Registry()
+
+# Метрики HTTP-запросов. Путь - шаблон маршрута ("/submit_data/{id}"), а не фактический URL.
+HTTP_REQUEST_DURATION = registry.register(Histogram(
+    "http_request_duration_seconds", "Время обработки HTTP-запроса.", ("method", "route", "status")
+))
+HTTP_RESPONSE_SIZE = registry.register(Histogram(
+    "http_response_size_bytes", "Размер тела HTTP-ответа.", ("method", "route"), buckets=SIZE_BUCKETS
+))
+HTTP_REQUESTS_IN_FLIGHT = registry.register(Gauge(
+    "http_requests_in_flight", "Количество обрабатываемых HTTP-запросов.", ("method",)
+))
+
+# Метрики запросов к базе данных по методам DatabaseManager.
+DB_QUERY_DURATION = registry.register(Histogram(
+    "db_query_duration_seconds", "Время выполнения запроса к базе данных.", ("method",)
+))
+DB_QUERIES = registry.register(Counter(
+    "db_queries_total", "Количество запросов к базе данных.", ("method",)
+))
+DB_POOL_WAIT = registry.register(Histogram(
+    "db_pool_wait_seconds", "Время ожидания свободного соединения из пула (без открытия новых соединений)."
+))
+
+# Метрики обработки изображений: декодирование и кодирование base64, сохранение в хранилище.
+IMAGE_PROCESSING_DURATION = registry.register(Histogram(
+    "image_processing_duration_seconds", "Время обработки изображения.", ("operation",)
+))
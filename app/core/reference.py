@@ -0,0 +1,65 @@
+import asyncio
+import hashlib
+import logging
+import time
+from typing import Awaitable, Callable, NamedTuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+
+
+# Неизменяемый снимок справочника: строки из базы данных, готовый JSON, его сильный ETag и время загрузки.
+class ReferenceSnapshot(NamedTuple):
+    rows: list
+    body: bytes
+    etag: str
+    loaded_at: float
+
+
+# Справочник, хранящийся в памяти процесса в виде снимка.
+# Снимок загружается при первом обращении функцией "load" (возвращает строки справочника,
+# "dump" сериализует их в JSON) и перезагружается через REFERENCE_REFRESH_INTERVAL секунд
+# или после invalidate(). Если перезагрузить не удалось, отдаётся прежний снимок.
+class ReferenceData:
+
+    def __init__(
+            self,
+            name: str,
+            load: Callable[[AsyncSession], Awaitable[list]],
+            dump: Callable[[list], bytes],
+    ):
+        self.name = name
+        self._load = load
+        self._dump = dump
+        self._snapshot: ReferenceSnapshot | None = None
+        # Блокировка, чтобы одновременные запросы не загружали справочник несколько раз.
+        self._lock = asyncio.Lock()
+
+    def _is_fresh(self, snapshot: ReferenceSnapshot | None) -> bool:
+        return snapshot is not None and time.monotonic() - snapshot.loaded_at < settings.REFERENCE_REFRESH_INTERVAL
+
+    async def get(self, session: AsyncSession) -> ReferenceSnapshot:
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot):
+            return snapshot
+        async with self._lock:
+            # Справочник мог быть загружен другим запросом, пока этот ждал блокировку.
+            if self._is_fresh(self._snapshot):
+                return self._snapshot
+            try:
+                rows = await self._load(session)
+            except Exception as e:
+                if self._snapshot is None:
+                    raise
+                logging.warning(f"Не удалось обновить справочник {self.name}, используется прежний: {e}")
+                return self._snapshot
+            body = self._dump(rows)
+            # ETag вычисляется по содержимому, поэтому не меняется, если справочник не изменился.
+            etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+            self._snapshot = ReferenceSnapshot(rows, body, etag, time.monotonic())
+            return self._snapshot
+
+    # Сбросить снимок: следующий запрос загрузит справочник из базы данных заново.
+    def invalidate(self) -> None:
+        self._snapshot = None
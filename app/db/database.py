@@ -2,10 +2,25 @@ from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine, Asyn
 from sqlalchemy.orm import DeclarativeBase
 
 from app.core.config import settings
+from app.core.metrics import registry
+from app.db.instrumentation import install_query_metrics
+from app.db.pool import InstrumentedQueuePool, pool_metrics_lines
 
 
-# Создать движок базы данных
-engine = create_async_engine(settings.async_database_url)
+# Создать движок базы данных с настраиваемым пулом соединений
+engine = create_async_engine(
+    settings.async_database_url,
+    poolclass=InstrumentedQueuePool,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    connect_args=settings.db_connect_args,
+)
+# Учитывать время и количество запросов в метриках, выводить состояние пула в GET /metrics
+install_query_metrics(engine)
+registry.add_collector(lambda: pool_metrics_lines(engine.pool))
 # Передать движок в генератор асинхронных сессий
 async_session_maker = async_sessionmaker(engine, class_=AsyncSession)
 
@@ -0,0 +1,102 @@
+import functools
+import inspect
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.metrics import DB_QUERY_DURATION, DB_QUERIES
+
+
+# Имя метода DatabaseManager, который сейчас выполняет запросы к базе данных.
+current_db_method: ContextVar[str | None] = ContextVar("current_db_method", default=None)
+
+
+# Статистика запросов к базе данных в рамках одного HTTP-запроса.
+class RequestQueryStats:
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        # Количество выполнений каждого текста запроса - для поиска N+1.
+        self.statements: Counter[str] = Counter()
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.duration += duration
+        self.statements[statement] += 1
+
+
+# Статистика запросов текущего HTTP-запроса. Заполняется, только если включена настройка SQL_INSTRUMENTATION.
+request_query_stats: ContextVar[RequestQueryStats | None] = ContextVar("request_query_stats", default=None)
+
+
+# Обернуть метод так, чтобы на время его выполнения был известен текущий метод.
+# При вложенных вызовах запросы относятся к внешнему методу.
+def _track_method(name: str, method):
+    if inspect.isasyncgenfunction(method):
+        # Асинхронный генератор выполняется частями, поэтому метод выставляется
+        # только на время получения очередного элемента.
+        @functools.wraps(method)
+        async def generator_wrapper(*args, **kwargs):
+            generator = method(*args, **kwargs)
+            try:
+                while True:
+                    token = current_db_method.set(current_db_method.get() or name)
+                    try:
+                        item = await generator.__anext__()
+                    except StopAsyncIteration:
+                        return
+                    finally:
+                        current_db_method.reset(token)
+                    yield item
+            finally:
+                await generator.aclose()
+        return generator_wrapper
+
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        token = current_db_method.set(current_db_method.get() or name)
+        try:
+            return await method(*args, **kwargs)
+        finally:
+            current_db_method.reset(token)
+    return wrapper
+
+
+# Декоратор класса: отслеживать все публичные асинхронные методы,
+# чтобы запросы к базе данных учитывались в метриках по имени метода.
+def instrument_db_methods(cls):
+    for name, method in list(vars(cls).items()):
+        if name.startswith("_"):
+            continue
+        if inspect.iscoroutinefunction(method) or inspect.isasyncgenfunction(method):
+            setattr(cls, name, _track_method(name, method))
+    return cls
+
+
+# Подключить к движку обработчики событий SQLAlchemy,
+# измеряющие время и количество запросов к базе данных.
+def install_query_metrics(engine: AsyncEngine) -> None:
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        method = current_db_method.get() or "other"
+        DB_QUERY_DURATION.observe(elapsed, method=method)
+        DB_QUERIES.inc(method=method)
+        stats = request_query_stats.get()
+        if stats is not None:
+            stats.record(statement, elapsed)
+
+    # Если запрос завершился ошибкой, after_cursor_execute не вызывается, убрать время начала запроса.
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def handle_error(context):
+        if context.connection is not None and context.connection.info.get("query_started"):
+            context.connection.info["query_started"].pop()
@@ -1,15 +1,19 @@
 from datetime import datetime
 from enum import IntEnum
 from sqlalchemy import (
+    BigInteger,
+    Computed,
     Integer,
     String,
     Numeric,
     ForeignKey,
+    Index,
+    Text,
     TIMESTAMP,
     text
 )
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy.dialects.postgresql import BYTEA
 
 from app.db.database import Base
 
@@ -22,6 +26,14 @@ class StatusPereval(IntEnum):
     REJECTED = 4
 
 
+# Статусы фоновых задач.
+class StatusJob(IntEnum):
+    QUEUED = 1
+    RUNNING = 2
+    DONE = 3
+    FAILED = 4
+
+
 # Модель пользователей.
 class User(Base):
     __tablename__ = "users"
@@ -39,6 +51,10 @@ class User(Base):
 # Модель координат перевалов.
 class Coord(Base):
     __tablename__ = "coords"
+    # Составной индекс для поиска перевалов в прямоугольной области и радиусе.
+    __table_args__ = (
+        Index("ix_coords_latitude_longitude", "latitude", "longitude"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     latitude: Mapped[float] = mapped_column(Numeric(9, 6), nullable=False)
@@ -46,9 +62,39 @@ class Coord(Base):
     height: Mapped[int] = mapped_column(Integer, nullable=False)
 
 
+# Номер текущей транзакции. Сохраняется в строках при каждом изменении, чтобы выдавать изменения
+# по порядку транзакций (GET /perevals/changes): транзакции с номером меньше xmin снимка уже завершены.
+CURRENT_XACT_ID = "pg_current_xact_id()::text::bigint"
+
+
+# Выражение поискового вектора перевала (конфигурация полнотекстового поиска "russian").
+PEREVAL_SEARCH_VECTOR = (
+    "setweight(to_tsvector('russian'::regconfig, coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('russian'::regconfig, coalesce(other_titles, '')), 'B') || "
+    "setweight(to_tsvector('russian'::regconfig, coalesce(connect, '')), 'C')"
+)
+
+
 # Модель перевалов.
 class PerevalAdded(Base):
     __tablename__ = "pereval_added"
+    __table_args__ = (
+        # Перевалы пользователя в порядке добавления (GET /submit_data/?user__email=).
+        Index("ix_pereval_added_creator_id_add_time_id", "creator_id", "add_time", "id"),
+        Index("ix_pereval_added_coord_id", "coord_id"),
+        Index("ix_pereval_added_status", "status"),
+        # Частичный индекс для очереди модерации: только перевалы со статусом "Ожидает модерации".
+        Index("ix_pereval_added_status_new", "id", postgresql_where=text(f"status = {StatusPereval.NEW.value}")),
+        # Полнотекстовый поиск по названиям и нечёткий поиск по названию (расширение pg_trgm).
+        Index("ix_pereval_added_search_vector", "search_vector", postgresql_using="gin"),
+        Index(
+            "ix_pereval_added_title_trgm", "title",
+            postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}
+        ),
+        Index("ix_pereval_added_area_id", "area_id"),
+        # Изменения перевалов по порядку транзакций (GET /perevals/changes).
+        Index("ix_pereval_added_change_xid_id", "change_xid", "id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     beauty_title: Mapped[str] = mapped_column(String(255), nullable=False)
@@ -58,11 +104,27 @@ class PerevalAdded(Base):
     add_time: Mapped[datetime] = mapped_column(TIMESTAMP, server_default=text("NOW()"))
     creator_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
     coord_id: Mapped[int] = mapped_column(ForeignKey("coords.id"), nullable=False)
+    # Область, в которой находится перевал (необязательно). При удалении области связь убирается.
+    area_id: Mapped[int] = mapped_column(ForeignKey("pereval_areas.id", ondelete="SET NULL"), nullable=True)
     level_winter: Mapped[str] = mapped_column(String(6), nullable=True)
     level_summer: Mapped[str] = mapped_column(String(6), nullable=True)
     level_autumn: Mapped[str] = mapped_column(String(6), nullable=True)
     level_spring: Mapped[str] = mapped_column(String(6), nullable=True)
     status: Mapped[int] = mapped_column(Integer, default=StatusPereval.NEW)
+    # Версия записи и время последнего изменения. Меняются при каждом изменении перевала,
+    # в том числе при смене статуса, и используются для условных GET-запросов (ETag, Last-Modified).
+    # Время хранится с часовым поясом, чтобы не зависеть от часового пояса сессии.
+    version: Mapped[int] = mapped_column(Integer, nullable=False, server_default=text("1"))
+    updated_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), nullable=False, server_default=text("NOW()"))
+    # Номер транзакции, в которой перевал последний раз добавлен или изменён.
+    change_xid: Mapped[int] = mapped_column(BigInteger, nullable=False, server_default=text(CURRENT_XACT_ID))
+    # Поисковый вектор названий перевала, вычисляется базой данных. Название важнее других названий,
+    # других названий - описания связей. Не загружается вместе с перевалом.
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(PEREVAL_SEARCH_VECTOR, persisted=True),
+        deferred=True
+    )
 
     creator: Mapped["User"] = relationship("User", back_populates="perevals")
     coords: Mapped["Coord"] = relationship()
@@ -70,17 +132,23 @@ class PerevalAdded(Base):
 
 
 # Модель изображений перевалов.
+# Само изображение лежит в хранилище файлов (app.storage.blob_store) под ключом "sha256".
 class PImage(Base):
     __tablename__ = "p_images"
 
     id: Mapped[int] = mapped_column(primary_key=True)
     title: Mapped[str] = mapped_column(String(255), nullable=False)
-    img: Mapped[bytes] = mapped_column(BYTEA, nullable=False)
+    sha256: Mapped[str] = mapped_column(String(64), nullable=False)
+    size: Mapped[int] = mapped_column(Integer, nullable=False)
+    mime_type: Mapped[str] = mapped_column(String(100), nullable=False)
 
 
 # Связующая таблица перевал-изображение.
 class PerevalImage(Base):
     __tablename__ = "pereval_images"
+    __table_args__ = (
+        Index("ix_pereval_images_image_id", "image_id"),
+    )
 
     pereval_id: Mapped[int] = mapped_column(ForeignKey("pereval_added.id"), primary_key=True)
     image_id: Mapped[int] = mapped_column(ForeignKey("p_images.id"), primary_key=True)
@@ -90,6 +158,21 @@ class PerevalImage(Base):
     image: Mapped["PImage"] = relationship()
 
 
+# Записи об изображениях, убранных из перевала при редактировании.
+# Нужны клиентам синхронизации (GET /perevals/changes), чтобы удалить изображения у себя.
+class PerevalImageTombstone(Base):
+    __tablename__ = "pereval_image_tombstones"
+    __table_args__ = (
+        Index("ix_pereval_image_tombstones_change_xid", "change_xid"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    pereval_id: Mapped[int] = mapped_column(ForeignKey("pereval_added.id"), nullable=False)
+    image_id: Mapped[int] = mapped_column(ForeignKey("p_images.id"), nullable=False)
+    change_xid: Mapped[int] = mapped_column(BigInteger, nullable=False, server_default=text(CURRENT_XACT_ID))
+    deleted_at: Mapped[datetime] = mapped_column(TIMESTAMP, nullable=False, server_default=text("NOW()"))
+
+
 # Модель областей, в которых могут находиться перевалы.
 class PerevalArea(Base):
     __tablename__ = "pereval_areas"
@@ -99,9 +182,53 @@ class PerevalArea(Base):
     title: Mapped[str] = mapped_column(String(255), nullable=False)
 
 
+# Таблица замыкания дерева областей: пара "предок - потомок" для каждой области и каждого
+# её предка (включая саму область с глубиной 0). Позволяет одним запросом по индексу найти
+# все перевалы области и её подобластей. Заполняется триггером на таблице "pereval_areas".
+class PerevalAreaClosure(Base):
+    __tablename__ = "pereval_areas_closure"
+    __table_args__ = (
+        Index("ix_pereval_areas_closure_descendant_id", "descendant_id"),
+    )
+
+    ancestor_id: Mapped[int] = mapped_column(ForeignKey("pereval_areas.id", ondelete="CASCADE"), primary_key=True)
+    descendant_id: Mapped[int] = mapped_column(ForeignKey("pereval_areas.id", ondelete="CASCADE"), primary_key=True)
+    depth: Mapped[int] = mapped_column(Integer, nullable=False)
+
+
 # Модель видов спорта на перевалах.
 class SprActivitiesType(Base):
     __tablename__ = "spr_activities_types"
 
     id: Mapped[int] = mapped_column(primary_key=True)
     title: Mapped[str] = mapped_column(String(255), nullable=False)
+
+
+# Модель фоновых задач. Таблица служит очередью: обработчики (app.jobs.worker) забирают задачи
+# запросом SELECT ... FOR UPDATE SKIP LOCKED, поэтому несколько обработчиков не получат одну задачу.
+class Job(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Частичные индексы для выбора задач: ожидающие выполнения и зависшие в обработке.
+        Index("ix_jobs_queued_run_after", "run_after", postgresql_where=text(f"status = {StatusJob.QUEUED.value}")),
+        Index("ix_jobs_running_locked_at", "locked_at", postgresql_where=text(f"status = {StatusJob.RUNNING.value}")),
+        # Частичный индекс для удаления старых завершённых задач.
+        Index(
+            "ix_jobs_finished_created_at", "created_at",
+            postgresql_where=text(f"status IN ({StatusJob.DONE.value}, {StatusJob.FAILED.value})")
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    # Тип задачи - имя обработчика в app.jobs.handlers.
+    kind: Mapped[str] = mapped_column(String(50), nullable=False)
+    # Данные задачи. Удаляются, когда задача выполнена.
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=True)
+    status: Mapped[int] = mapped_column(Integer, nullable=False, server_default=text(str(StatusJob.QUEUED.value)))
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, server_default=text("0"))
+    max_attempts: Mapped[int] = mapped_column(Integer, nullable=False, server_default=text("5"))
+    # Время, не раньше которого задачу можно выполнять (используется для повторов с задержкой).
+    run_after: Mapped[datetime] = mapped_column(TIMESTAMP, nullable=False, server_default=text("NOW()"))
+    locked_at: Mapped[datetime] = mapped_column(TIMESTAMP, nullable=True)
+    last_error: Mapped[str] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(TIMESTAMP, nullable=False, server_default=text("NOW()"))
@@ -0,0 +1,110 @@
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core.metrics import DB_POOL_WAIT
+
+
+# Статистика получения соединений из пула.
+class PoolStats:
+
+    def __init__(self):
+        self.acquisitions = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record(self, wait_seconds: float) -> None:
+        self.acquisitions += 1
+        self.wait_seconds_total += wait_seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, wait_seconds)
+
+
+# Время открытия новых соединений при текущем получении соединения из пула (None - вне получения).
+# Вычитается из времени ожидания, чтобы в нём учитывалось только ожидание свободного соединения.
+_connect_seconds: ContextVar[float | None] = ContextVar("db_pool_connect_seconds", default=None)
+
+
+# Пул соединений, измеряющий время ожидания свободного соединения
+# и количество ошибок из-за истечения pool_timeout.
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        # QueuePool._do_get может вызвать себя повторно: это то же получение соединения.
+        if _connect_seconds.get() is not None:
+            return super()._do_get()
+        token = _connect_seconds.set(0.0)
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.stats.timeouts += 1
+            raise
+        finally:
+            wait_seconds = time.perf_counter() - started - _connect_seconds.get()
+            _connect_seconds.reset(token)
+            self.stats.record(wait_seconds)
+            DB_POOL_WAIT.observe(wait_seconds)
+
+    def _create_connection(self):
+        started = time.perf_counter()
+        try:
+            return super()._create_connection()
+        finally:
+            connect_seconds = _connect_seconds.get()
+            if connect_seconds is not None:
+                _connect_seconds.set(connect_seconds + time.perf_counter() - started)
+
+
+# Получить текущее состояние пула соединений.
+def pool_status(pool: InstrumentedQueuePool) -> dict:
+    stats = pool.stats
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        # Количество соединений, открытых сверх pool_size.
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": pool._max_overflow,
+        "acquisitions": stats.acquisitions,
+        "timeouts": stats.timeouts,
+        "wait_seconds_total": round(stats.wait_seconds_total, 6),
+        "wait_seconds_max": round(stats.wait_seconds_max, 6),
+        "wait_seconds_avg": round(stats.wait_seconds_total / stats.acquisitions, 6) if stats.acquisitions else 0.0,
+    }
+
+
+# Тип и описание метрик пула в формате Prometheus.
+# Количество получений соединений, ошибок и суммарное время ожидания только растут, поэтому это счётчики.
+POOL_METRICS = {
+    "size": ("gauge", "Размер пула соединений (pool_size)."),
+    "checked_in": ("gauge", "Свободные соединения в пуле."),
+    "checked_out": ("gauge", "Соединения, выданные из пула."),
+    "overflow": ("gauge", "Соединения, открытые сверх pool_size."),
+    "max_overflow": ("gauge", "Наибольшее количество соединений сверх pool_size (max_overflow)."),
+    "acquisitions": ("counter", "Количество получений соединения из пула."),
+    "timeouts": ("counter", "Количество ошибок получения соединения из-за истечения pool_timeout."),
+    "wait_seconds_total": (
+        "counter", "Суммарное время ожидания свободного соединения (без открытия новых соединений)."
+    ),
+    "wait_seconds_max": ("gauge", "Наибольшее время ожидания свободного соединения."),
+    "wait_seconds_avg": ("gauge", "Среднее время ожидания свободного соединения."),
+}
+
+
+# Получить состояние пула соединений в текстовом формате Prometheus.
+def pool_metrics_lines(pool: InstrumentedQueuePool) -> list[str]:
+    lines = []
+    for key, value in pool_status(pool).items():
+        name = f"db_pool_{key}"
+        kind, documentation = POOL_METRICS[key]
+        lines.append(f"# HELP {name} {documentation}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.append(f"{name} {value}")
+    return lines
@@ -1,99 +1,439 @@
-import base64
-from typing import List
+import asyncio
+import json
+import math
+import re
+import uuid
+from datetime import datetime, timedelta
+from typing import List, AsyncIterator
 
 from fastapi import HTTPException
-from sqlalchemy import select, delete, update
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import (
+    select, delete, update, insert, tuple_, func, cast, and_, or_, literal_column, Boolean, Float, Select, Row, RowMapping
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert, REGCONFIG
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError, DataError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import selectinload, load_only
+from sqlalchemy.orm.attributes import set_committed_value
 
-from app.db.models import PerevalAdded, User, Coord, StatusPereval, PerevalImage, PImage
+from app.core.cache import invalidate_pereval, user_id_cache
+from app.core.config import settings
+from app.db.instrumentation import instrument_db_methods
+from app.db.models import (
+    PerevalAdded, User, Coord, StatusPereval, PerevalImage, PImage, Job, StatusJob, PerevalArea, PerevalAreaClosure,
+    SprActivitiesType, PerevalImageTombstone, CURRENT_XACT_ID
+)
+from app.storage.blob_store import blob_store, FileTooLargeError
+from app.storage.image_codec import store_image
+
+
+# Префикс ключей временных файлов хранилища с изображениями, ожидающими фоновой обработки.
+STAGED_IMAGES_PREFIX = 'staged-'
+
+
+# Сохранить изображения в исходном виде (base64, без декодирования) во временный файл хранилища,
+# откуда их заберёт фоновая задача. Вернуть ключ временного файла.
+async def _stage_images(images: list[dict]) -> str:
+    key = f"{STAGED_IMAGES_PREFIX}{uuid.uuid4().hex}"
+    data = await asyncio.to_thread(json.dumps, images)
+    await blob_store.put(key, data.encode('utf-8'), 'application/json')
+    return key
+
+
+# Сохранить изображения перевала в хранилище файлов и вернуть данные перевала,
+# в которых вместо содержимого изображений - их ключи, размеры и MIME-типы.
+async def _store_pereval_images(pereval_data: dict) -> dict:
+    images = await asyncio.gather(*(store_image(image) for image in pereval_data.get('images', [])))
+    return {**pereval_data, 'images': list(images)}
+
+
+# Разобрать данные о перевале на строки для таблиц "users", "coords", "pereval_added"
+# и список изображений.
+# Исходный словарь не изменяется.
+def _split_pereval_data(pereval_data: dict) -> tuple[dict, dict, dict, list[dict]]:
+    pereval_data = dict(pereval_data)
+    user_data = pereval_data.pop('user')
+
+    coord_data = pereval_data.pop('coords')
+    coord_row = {
+        'latitude': float(coord_data['latitude']),
+        'longitude': float(coord_data['longitude']),
+        'height': int(coord_data['height'])
+    }
+
+    # Вынести данные об уровне сложности перевала из вложенного словаря "level".
+    level_data = pereval_data.pop('level')
+    pereval_data.update({
+        'level_winter': level_data.get('winter'),
+        'level_summer': level_data.get('summer'),
+        'level_autumn': level_data.get('autumn'),
+        'level_spring': level_data.get('spring')
+    })
+
+    # Убрать информацию о часовом поясе.
+    add_time = pereval_data.pop('add_time')
+    if add_time.tzinfo is not None:
+        add_time = add_time.replace(tzinfo=None)
+    pereval_data.update({
+        'add_time': add_time,
+        'status': StatusPereval.NEW
+    })
+
+    image_rows = list(pereval_data.pop('images', []))
+    return user_data, coord_row, pereval_data, image_rows
+
+
+# Значения столбцов, которые меняются при любом изменении перевала:
+# версия, время изменения и номер транзакции изменения (для GET /perevals/changes).
+def _change_values() -> dict:
+    return {
+        'version': PerevalAdded.version + 1,
+        'updated_at': func.now(),
+        'change_xid': literal_column(CURRENT_XACT_ID),
+    }
+
+
+# Построить запрос перевалов пользователя, отсортированных от новых к старым по ("add_time", "id").
+# Постраничный вывод: "limit" - размер страницы, "after" - пара ("add_time", "id")
+# последнего перевала предыдущей страницы (keyset-пагинация).
+# Проекция: "columns" - загружаемые столбцы "pereval_added" (None - все),
+# "with_coords" и "with_images" - загружать ли координаты и изображения.
+def _perevals_of_user_query(
+        user_id: int,
+        limit: int | None = None,
+        after: tuple[datetime, int] | None = None,
+        columns: list[str] | None = None,
+        with_coords: bool = True,
+        with_images: bool = True
+) -> Select:
+    query = select(PerevalAdded).where(PerevalAdded.creator_id == user_id)
+    # Загрузить только запрошенные столбцы и связанные модели.
+    # "id", "add_time" и "coord_id" нужны для пагинации и подгрузки координат.
+    if columns is not None:
+        query = query.options(load_only(*(
+            getattr(PerevalAdded, column)
+            for column in {'id', 'add_time', 'coord_id', *columns}
+        )))
+    if with_coords:
+        query = query.options(selectinload(PerevalAdded.coords))
+    if with_images:
+        query = query.options(selectinload(PerevalAdded.images).selectinload(PerevalImage.image))
+    if after is not None:
+        query = query.where(tuple_(PerevalAdded.add_time, PerevalAdded.id) < tuple_(*after))
+    query = query.order_by(PerevalAdded.add_time.desc(), PerevalAdded.id.desc())
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+# Средний радиус Земли в километрах.
+EARTH_RADIUS_KM = 6371.0
+
+
+# Построить условие попадания координат перевала в прямоугольную область.
+# Если min_lon > max_lon, область пересекает 180-й меридиан и делится на две части.
+def _bbox_condition(min_lat: float, min_lon: float, max_lat: float, max_lon: float):
+    latitude = Coord.latitude.between(min_lat, max_lat)
+    if min_lon <= max_lon:
+        return and_(latitude, Coord.longitude.between(min_lon, max_lon))
+    return and_(latitude, or_(Coord.longitude >= min_lon, Coord.longitude <= max_lon))
+
+
+# Вычислить прямоугольную область, описанную вокруг круга с центром (lat, lon) и радиусом radius_km.
+# Используется для отбора кандидатов по индексу перед точной проверкой расстояния.
+def _bbox_around(lat: float, lon: float, radius_km: float) -> tuple[float, float, float, float]:
+    angular_radius = radius_km / EARTH_RADIUS_KM
+    min_lat = lat - math.degrees(angular_radius)
+    max_lat = lat + math.degrees(angular_radius)
+    # Если круг захватывает полюс, подходят все долготы.
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90), -180, min(max_lat, 90), 180
+    delta_lon = math.degrees(math.asin(math.sin(angular_radius) / math.cos(math.radians(lat))))
+    min_lon = lon - delta_lon
+    max_lon = lon + delta_lon
+    # Перенести долготы за пределами [-180, 180] на другую сторону 180-го меридиана.
+    if min_lon < -180:
+        min_lon += 360
+    if max_lon > 180:
+        max_lon -= 360
+    return min_lat, min_lon, max_lat, max_lon
+
+
+# Построить выражение расстояния (в километрах) от точки (lat, lon) до координат перевала
+# по формуле гаверсинусов.
+def _distance_km(lat: float, lon: float):
+    lat1 = math.radians(lat)
+    lat2 = func.radians(cast(Coord.latitude, Float), type_=Float)
+    delta_lat = lat2 - lat1
+    delta_lon = func.radians(cast(Coord.longitude, Float), type_=Float) - math.radians(lon)
+    haversine = (
+        func.power(func.sin(delta_lat * 0.5, type_=Float), 2)
+        + math.cos(lat1) * func.cos(lat2) * func.power(func.sin(delta_lon * 0.5, type_=Float), 2)
+    )
+    # Ограничить аргумент arcsin единицей на случай ошибок округления.
+    return 2 * EARTH_RADIUS_KM * func.asin(func.least(func.sqrt(haversine), 1.0), type_=Float)
+
+
+# Количество пользователей в одном многострочном INSERT: у пользователя до 5 полей,
+# а asyncpg принимает не больше 32767 параметров в запросе.
+USERS_UPSERT_CHUNK_SIZE = 1000
+
+
+# Построить условие, что задача всё ещё принадлежит обработчику, забравшему её попыткой "job.attempts".
+# Если задача зависла и её забрал другой обработчик, номер попытки уже другой.
+def _job_owned(job: Row):
+    return and_(Job.id == job.id, Job.status == StatusJob.RUNNING, Job.attempts == job.attempts)
+
+
+# Столбцы, возвращаемые поиском перевалов по координатам.
+SEARCH_COLUMNS = (
+    PerevalAdded.id,
+    PerevalAdded.beauty_title,
+    PerevalAdded.title,
+    PerevalAdded.status,
+    Coord.latitude,
+    Coord.longitude,
+    Coord.height,
+)
+
+
+# Построить текст запроса полнотекстового поиска: все слова должны встретиться,
+# последнее слово ищется как префикс, чтобы поиск работал по мере ввода.
+# Вернуть "None", если в строке нет ни одного слова.
+def _prefix_tsquery(query: str) -> str | None:
+    words = re.findall(r"\w+", query.lower())
+    if not words:
+        return None
+    return " & ".join(words[:-1] + [f"{words[-1]}:*"])
 
 
 # Класс, реализующий логику работы с базой данных.
+# Запросы публичных методов учитываются в метриках по имени метода.
+@instrument_db_methods
 class DatabaseManager:
 
+    # Асинхронный метод загрузки изображений, переданных парами ("id" перевала, изображение).
+    # Содержимое изображений сохраняется в хранилище файлов, в таблицу "p_images"
+    # попадают только хеш, размер и MIME-тип. Изображения и их привязки к перевалам
+    # через таблицу "PerevalImage" вставляются двумя многострочными запросами.
+    async def _insert_images(
+            self,
+            session: AsyncSession,
+            images: list[tuple[int, dict]]
+    ) -> None:
+        if not images:
+            return
+        image_rows = await asyncio.gather(*(store_image(image) for _, image in images))
+        # Поставить в очередь создание уменьшенных копий в той же транзакции, чтобы копии были созданы,
+        # даже если процесс перезапустится. Одна задача на каждый файл; если копии уже есть, задача ничего не делает.
+        if settings.IMAGE_VARIANTS_ENABLED:
+            keys = dict.fromkeys(row['sha256'] for row in image_rows if row['mime_type'].startswith('image/'))
+            if keys:
+                await session.execute(
+                    insert(Job), [{'kind': 'image_variants', 'payload': {'sha256': key}} for key in keys]
+                )
+        image_ids = (await session.scalars(
+            insert(PImage).returning(PImage.id, sort_by_parameter_order=True),
+            image_rows
+        )).all()
+        await session.execute(
+            insert(PerevalImage),
+            [
+                {'pereval_id': pereval_id, 'image_id': image_id}
+                for (pereval_id, _), image_id in zip(images, image_ids)
+            ]
+        )
+
+    # Асинхронный метод вставки пачки перевалов многострочными INSERT ... RETURNING.
+    # Количество запросов к базе данных не зависит от числа перевалов и изображений.
+    # Транзакцию не закрывает. Возвращает "id" перевалов в порядке входных данных.
+    async def _insert_perevals(
+            self,
+            session: AsyncSession,
+            perevals_data: list[dict]
+    ) -> list[int]:
+        rows = [_split_pereval_data(pereval_data) for pereval_data in perevals_data]
+
+        # Получить "id" пользователей пачки из кеша процесса.
+        users = {}
+        for user_data, _, _, _ in rows:
+            users.setdefault(user_data['email'], user_data)
+        user_ids = {}
+        for email in users:
+            user_id = user_id_cache.get(email)
+            if user_id is not None:
+                user_ids[email] = user_id
+
+        # Добавить пользователей, которых нет в кеше (если их нет и в базе), и получить их "id".
+        # Пустое обновление при конфликте нужно, чтобы RETURNING вернул и уже существующие строки.
+        # Поэтому одновременные первые заявки одного пользователя не конфликтуют по уникальному email.
+        # Пользователи вставляются частями, чтобы не превысить ограничение на число параметров запроса.
+        missing_users = [user_data for email, user_data in users.items() if email not in user_ids]
+        for start in range(0, len(missing_users), USERS_UPSERT_CHUNK_SIZE):
+            users_stmt = pg_insert(User).values(missing_users[start:start + USERS_UPSERT_CHUNK_SIZE])
+            users_stmt = users_stmt.on_conflict_do_update(
+                index_elements=[User.email],
+                set_={'email': users_stmt.excluded.email}
+            ).returning(User.email, User.id, literal_column('xmax = 0', Boolean).label('inserted'))
+            for email, user_id, inserted in (await session.execute(users_stmt)).all():
+                user_ids[email] = user_id
+                # Кешировать только пользователей, которые уже были в базе: новый пользователь
+                # исчезнет, если транзакция будет отменена (у вставленной строки xmax = 0).
+                if not inserted:
+                    user_id_cache.set(email, user_id)
+
+        try:
+            # Загрузить в базу координаты перевалов.
+            coord_ids = (await session.scalars(
+                insert(Coord).returning(Coord.id, sort_by_parameter_order=True),
+                [coord_row for _, coord_row, _, _ in rows]
+            )).all()
+
+            # Загрузить в базу данные о перевалах.
+            pereval_ids = (await session.scalars(
+                insert(PerevalAdded).returning(PerevalAdded.id, sort_by_parameter_order=True),
+                [
+                    {**pereval_row, 'creator_id': user_ids[user_data['email']], 'coord_id': coord_id}
+                    for (user_data, _, pereval_row, _), coord_id in zip(rows, coord_ids)
+                ]
+            )).all()
+        except SQLAlchemyError:
+            # Пользователь из кеша мог быть удалён из базы: при повторной попытке запросить его заново.
+            user_id_cache.discard(*users)
+            raise
+
+        # Загрузить изображения всех перевалов.
+        await self._insert_images(session, [
+            (pereval_id, image)
+            for (_, _, _, pereval_images), pereval_id in zip(rows, pereval_ids)
+            for image in pereval_images
+        ])
+        return list(pereval_ids)
+
+    # Асинхронный метод добавления пачки перевалов в одной транзакции.
+    # Изображения сохраняются в хранилище файлов один раз до вставки.
+    # Сначала пачка вставляется целиком. Если это не удалось и "atomic" не задан,
+    # перевалы вставляются по одному, каждый в своей точке сохранения,
+    # чтобы ошибка одного перевала не отменяла остальные.
+    # Возвращает для каждого перевала тройку ("id", 200, None) или (None, код ошибки, сообщение):
+    # 413 - слишком большое изображение, 400 - данные нарушают ограничения базы данных
+    # (например, несуществующий внешний ключ), 500 - другие ошибки базы данных.
+    async def add_perevals(
+            self,
+            session: AsyncSession,
+            perevals_data: list[dict],
+            atomic: bool = False
+    ) -> list[tuple[int | None, int, str | None]]:
+        if not perevals_data:
+            return []
+        results: list[tuple[int | None, int, str | None]] = [(None, 200, None)] * len(perevals_data)
+        stored = await asyncio.gather(
+            *(_store_pereval_images(pereval_data) for pereval_data in perevals_data), return_exceptions=True
+        )
+        for index, item in enumerate(stored):
+            if isinstance(item, FileTooLargeError) and not atomic:
+                results[index] = (None, 413, str(item))
+            elif isinstance(item, BaseException):
+                raise item
+        indexes = [index for index, item in enumerate(stored) if not isinstance(item, BaseException)]
+        perevals_data = [stored[index] for index in indexes]
+        if not perevals_data:
+            return results
+
+        try:
+            async with session.begin_nested():
+                pereval_ids = await self._insert_perevals(session, perevals_data)
+            await session.commit()
+            for index, pereval_id in zip(indexes, pereval_ids):
+                results[index] = (pereval_id, 200, None)
+            return results
+        except SQLAlchemyError:
+            # Если пачка должна быть добавлена целиком, откатить транзакцию и пробросить ошибку.
+            if atomic:
+                await session.rollback()
+                raise
+
+        for index, pereval_data in zip(indexes, perevals_data):
+            try:
+                async with session.begin_nested():
+                    pereval_ids = await self._insert_perevals(session, [pereval_data])
+                results[index] = (pereval_ids[0], 200, None)
+            except (IntegrityError, DataError) as e:
+                results[index] = (None, 400, f"Некорректные данные перевала: {e.orig}")
+            except SQLAlchemyError as e:
+                results[index] = (None, 500, f"Ошибка базы данных: {e}")
+        # Закрыть сессию работы с базой данных.
+        await session.commit()
+        return results
+
     # Асинхронный метод добавления новых перевалов.
+    # Число запросов к базе данных постоянно и не зависит от количества изображений:
+    # upsert пользователя (если его "id" нет в кеше), вставка координат, перевала, изображений
+    # и связей перевал-изображение.
     async def add_pereval(
             self,
             session: AsyncSession,
             pereval_data: dict
     ) -> int:
-
-        # Загрузить в базу данные пользователя (если его нет в базе), добавляющего информацию о перевале.
-        user_data = pereval_data.pop('user')
-        result = await session.execute(select(User).where(User.email == user_data['email']))
-        user = result.scalars().first()
-        if not user:
-            user = User(**user_data)
-            session.add(user)
-            await session.flush()  # Получить id пользователя.
-
-        # Загрузить в базу данные координат перевала.
-        coord_data = pereval_data.pop('coords')
-        coord = Coord(
-            latitude=float(coord_data['latitude']),
-            longitude=float(coord_data['longitude']),
-            height=int(coord_data['height'])
-        )
-        session.add(coord)
-        await session.flush()  # Получить ID координат.
-
-        # Вынести данные об уровне сложности перевала из вложенного словаря "level"
-        # в основной словарь "pereval_data".
-        level_data = pereval_data.pop('level')
-        pereval_data.update({
-            'level_winter': level_data.get('winter'),
-            'level_summer': level_data.get('summer'),
-            'level_autumn': level_data.get('autumn'),
-            'level_spring': level_data.get('spring')
-        })
-
-        # Убрать информацию о часовом поясе.
-        add_time = pereval_data.pop('add_time')
-        if add_time.tzinfo is not None:
-            add_time = add_time.replace(tzinfo=None)
-
-        # Сохранить изображения перевала в отдельную переменную.
-        images_data = pereval_data.pop('images', [])
-
-        # Загрузить в базу данные о перевале.
-        pereval = PerevalAdded(
-            **pereval_data,
-            add_time=add_time,
-            creator_id=user.id,
-            coord_id=coord.id,
-            status=StatusPereval.NEW
-        )
-        session.add(pereval)
-        await session.flush()
-
-        # Сохранить "id" перевала для вывода из метода до закрытия сессии.
-        result_pereval_id = pereval.id
-
-        # Преобразовать изображения перевала, если ни в формате "BYTES".
-        # Загрузить изображения в базу данных.
-        # Привязать изображения к перевалу через таблицу "PerevalImage".
-        for img_data in images_data:
-            try:
-                img_bytes = base64.b64decode(img_data['data'])
-            except Exception:
-                img_bytes = img_data['data'].encode('utf-8')
-            image = PImage(title=img_data['title'], img=img_bytes)
-            session.add(image)
-            await session.flush()
-
-            pereval_image = PerevalImage(
-                pereval_id=pereval.id,
-                image_id=image.id
-            )
-            session.add(pereval_image)
+        # Загрузить в базу данные пользователя (если его нет в базе), координаты,
+        # перевал и его изображения. Получить "id" перевала.
+        result_pereval_id, = await self._insert_perevals(session, [pereval_data])
 
         # Закрыть сессию работы с базой данных.
         await session.commit()
         # Вернуть "id" перевала.
         return result_pereval_id
 
+    # Асинхронный метод быстрого добавления перевала: сохраняются пользователь, координаты и перевал,
+    # а изображения в исходном виде (base64, без декодирования) копируются во временный файл хранилища,
+    # и в одной транзакции с перевалом ставится задача на их обработку. Декодирование, проверку,
+    # сохранение и привязку изображений выполняет обработчик очереди, после чего ставит в очередь
+    # уведомление о новом перевале (без изображений - сразу здесь).
+    # Если транзакцию закрыть не удалось, временный файл удаляется.
+    async def add_pereval_deferred(
+            self,
+            session: AsyncSession,
+            pereval_data: dict
+    ) -> int:
+        images = pereval_data.get('images', [])
+        result_pereval_id, = await self._insert_perevals(session, [{**pereval_data, 'images': []}])
+        if not images:
+            await self.enqueue_job(session, 'pereval_submitted', {'pereval_id': result_pereval_id})
+            await session.commit()
+            return result_pereval_id
+
+        staged_key = await _stage_images(images)
+        try:
+            await self.enqueue_job(
+                session, 'pereval_images', {'pereval_id': result_pereval_id, 'staged_key': staged_key}
+            )
+            # Закрыть сессию работы с базой данных.
+            await session.commit()
+        except BaseException:
+            await blob_store.delete(staged_key)
+            raise
+        return result_pereval_id
+
+    # Асинхронный метод добавления изображений к существующему перевалу (из фоновой задачи).
+    # Увеличивает версию перевала. Транзакцию не закрывает.
+    # Возвращает прежнюю версию перевала или "None", если перевала нет.
+    async def attach_pereval_images(
+            self,
+            session: AsyncSession,
+            pereval_id: int,
+            images: list[dict]
+    ) -> int | None:
+        new_version = await session.scalar(
+            update(PerevalAdded)
+            .where(PerevalAdded.id == pereval_id)
+            .values(**_change_values())
+            .returning(PerevalAdded.version)
+        )
+        if new_version is None:
+            return None
+        await self._insert_images(session, [(pereval_id, image) for image in images])
+        return new_version - 1
+
     # Асинхронный метод получения перевала по "id".
     async def get_pereval_on_id(
             self,
@@ -115,32 +455,272 @@ class DatabaseManager:
             return None
         return pereval_data
 
-    # Асинхронный метод получения всех перевалов,
-    # добавленных пользователем с запрашиваемым email.
-    async def get_perevals_on_email(
+    # Асинхронный метод получения версии и времени изменения перевала по "id".
+    # Загружает только два столбца, без связанных моделей. Если перевала нет, вернуть "None".
+    async def get_pereval_version(
+            self,
+            session: AsyncSession,
+            pereval_id: int
+    ) -> tuple[int, datetime] | None:
+        result = await session.execute(
+            select(PerevalAdded.version, PerevalAdded.updated_at)
+            .where(PerevalAdded.id == pereval_id)
+        )
+        return result.first()
+
+    # Асинхронный метод получения сводной версии перевалов пользователя с запрашиваемым email:
+    # количество перевалов, сумма их версий и время последнего изменения.
+    # Сводная версия меняется при добавлении или изменении любого перевала пользователя.
+    async def get_perevals_version_on_email(
+            self,
+            session: AsyncSession,
+            user__email: str
+    ) -> tuple[int, int, datetime | None]:
+        result = await session.execute(
+            select(
+                func.count(PerevalAdded.id),
+                func.coalesce(func.sum(PerevalAdded.version), 0),
+                func.max(PerevalAdded.updated_at)
+            )
+            .join(User, PerevalAdded.creator_id == User.id)
+            .where(User.email == user__email)
+        )
+        return tuple(result.one())
+
+    # Асинхронный метод получения перевалов, изменённых после курсора "after" - пары
+    # (номер транзакции изменения, "id"), в порядке изменения. Выводятся принятые перевалы
+    # и все перевалы пользователя "user_id". Выдаются только изменения завершённых транзакций
+    # (с номером меньше xmin текущего снимка), поэтому изменение, закоммиченное позже изменений
+    # с большим номером, не будет пропущено. xmin общий для всего кластера: пока любая сессия
+    # держит открытую транзакцию, более новые изменения не выдаются (см. DB_IDLE_IN_TRANSACTION_TIMEOUT_MS).
+    # Возвращает перевалы (не больше "limit"), записи об изображениях, удалённых из выводимых
+    # перевалов с номером транзакции от after[0] до конца страницы (не больше "limit",
+    # если только их не удалили одной транзакцией), курсор следующей страницы и признак того,
+    # что изменения выданы не все.
+    async def get_pereval_changes(
+            self,
+            session: AsyncSession,
+            user_id: int | None,
+            after: tuple[int, int],
+            limit: int
+    ) -> tuple[list[PerevalAdded], list[Row], tuple[int, int], bool]:
+        snapshot_xmin = await session.scalar(
+            select(literal_column("pg_snapshot_xmin(pg_current_snapshot())::text::bigint"))
+        )
+        visible = PerevalAdded.status == StatusPereval.ACCEPTED
+        if user_id is not None:
+            visible = or_(visible, PerevalAdded.creator_id == user_id)
+        perevals = (await session.scalars(
+            select(PerevalAdded)
+            .options(
+                selectinload(PerevalAdded.creator),
+                selectinload(PerevalAdded.coords),
+                selectinload(PerevalAdded.images).selectinload(PerevalImage.image)
+            )
+            .where(
+                tuple_(PerevalAdded.change_xid, PerevalAdded.id) > tuple_(*after),
+                PerevalAdded.change_xid < snapshot_xmin,
+                visible
+            )
+            .order_by(PerevalAdded.change_xid, PerevalAdded.id)
+            .limit(limit)
+        )).all()
+
+        # Граница записей об удалённых изображениях: до конца страницы или до xmin снимка.
+        until = perevals[-1].change_xid + 1 if len(perevals) == limit else snapshot_xmin
+        tombstones_query = (
+            select(PerevalImageTombstone.change_xid, PerevalImageTombstone.pereval_id, PerevalImageTombstone.image_id)
+            .join(PerevalAdded, PerevalImageTombstone.pereval_id == PerevalAdded.id)
+            .where(PerevalImageTombstone.change_xid >= after[0], visible)
+            .order_by(PerevalImageTombstone.change_xid, PerevalImageTombstone.id)
+        )
+        tombstones = (await session.execute(
+            tombstones_query.where(PerevalImageTombstone.change_xid < until).limit(limit + 1)
+        )).all()
+
+        # Если записей больше "limit", закончить страницу перед транзакцией первой не поместившейся записи:
+        # записи одной транзакции не делятся между страницами. Если все они из одной транзакции,
+        # выдать её записи целиком, иначе курсор не сдвинется.
+        if len(tombstones) > limit:
+            until = tombstones[limit].change_xid
+            if until == tombstones[0].change_xid:
+                until += 1
+                tombstones = (await session.execute(
+                    tombstones_query.where(PerevalImageTombstone.change_xid < until)
+                )).all()
+            else:
+                tombstones = [tombstone for tombstone in tombstones if tombstone.change_xid < until]
+            perevals = [pereval for pereval in perevals if pereval.change_xid < until]
+            return perevals, [tombstone[1:] for tombstone in tombstones], (until, 0), True
+
+        tombstones = [tombstone[1:] for tombstone in tombstones]
+        # Если страница полная, продолжить с последнего выданного перевала,
+        # иначе выданы все изменения завершённых транзакций до xmin снимка.
+        if len(perevals) == limit:
+            return list(perevals), tombstones, (perevals[-1].change_xid, perevals[-1].id), True
+        return list(perevals), tombstones, (max(snapshot_xmin, after[0]), 0), False
+
+    # Асинхронный метод поиска перевалов в прямоугольной области.
+    # Загружает только столбцы, нужные для вывода на карте, отбор идёт по индексу координат.
+    async def search_perevals_in_bbox(
+            self,
+            session: AsyncSession,
+            min_lat: float,
+            min_lon: float,
+            max_lat: float,
+            max_lon: float,
+            limit: int
+    ) -> list[RowMapping]:
+        result = await session.execute(
+            select(*SEARCH_COLUMNS)
+            .join(Coord, PerevalAdded.coord_id == Coord.id)
+            .where(_bbox_condition(min_lat, min_lon, max_lat, max_lon))
+            .order_by(PerevalAdded.id)
+            .limit(limit)
+        )
+        return list(result.mappings().all())
+
+    # Асинхронный метод поиска перевалов в радиусе "radius_km" от точки (lat, lon).
+    # Сначала кандидаты отбираются по индексу в описанной вокруг круга области,
+    # затем для них проверяется точное расстояние. Результат отсортирован по удалённости.
+    async def search_perevals_near(
+            self,
+            session: AsyncSession,
+            lat: float,
+            lon: float,
+            radius_km: float,
+            limit: int
+    ) -> list[RowMapping]:
+        distance = _distance_km(lat, lon)
+        result = await session.execute(
+            select(*SEARCH_COLUMNS, distance.label('distance_km'))
+            .join(Coord, PerevalAdded.coord_id == Coord.id)
+            .where(_bbox_condition(*_bbox_around(lat, lon, radius_km)))
+            .where(distance <= radius_km)
+            .order_by(distance, PerevalAdded.id)
+            .limit(limit)
+        )
+        return list(result.mappings().all())
+
+    # Асинхронный метод поиска перевалов по названиям.
+    # Перевал находится, если слова запроса есть в названиях (полнотекстовый поиск по "search_vector",
+    # последнее слово - префикс) или название похоже на запрос с опечатками (pg_trgm, оператор <%).
+    # Оба условия используют GIN-индексы. Результаты отсортированы по релевантности.
+    async def search_perevals_by_text(
+            self,
+            session: AsyncSession,
+            query: str,
+            limit: int,
+            offset: int = 0
+    ) -> list[RowMapping]:
+        tsquery_text = _prefix_tsquery(query)
+        similarity = func.word_similarity(query, PerevalAdded.title)
+        conditions = [PerevalAdded.title.op('%>')(query)]
+        rank = similarity
+        if tsquery_text is not None:
+            tsquery = func.to_tsquery(cast('russian', REGCONFIG), tsquery_text)
+            conditions.append(PerevalAdded.search_vector.op('@@')(tsquery))
+            rank = func.greatest(func.ts_rank_cd(PerevalAdded.search_vector, tsquery), similarity)
+        result = await session.execute(
+            select(*SEARCH_COLUMNS, rank.label('rank'))
+            .join(Coord, PerevalAdded.coord_id == Coord.id)
+            .where(or_(*conditions))
+            .order_by(rank.desc(), PerevalAdded.id)
+            .limit(limit)
+            .offset(offset)
+        )
+        return list(result.mappings().all())
+
+    # Асинхронный метод получения всех областей перевалов для построения дерева областей.
+    async def get_pereval_areas(self, session: AsyncSession) -> list[Row]:
+        result = await session.execute(
+            select(PerevalArea.id, PerevalArea.id_parent, PerevalArea.title).order_by(PerevalArea.id)
+        )
+        return list(result.all())
+
+    # Асинхронный метод получения справочника видов спорта на перевалах.
+    async def get_activities_types(self, session: AsyncSession) -> list[Row]:
+        result = await session.execute(
+            select(SprActivitiesType.id, SprActivitiesType.title).order_by(SprActivitiesType.id)
+        )
+        return list(result.all())
+
+    # Асинхронный метод подсчёта перевалов в каждой области (без учёта подобластей).
+    # Выполняется по индексу "area_id" без чтения строк перевалов.
+    async def count_perevals_by_area(self, session: AsyncSession) -> dict[int, int]:
+        result = await session.execute(
+            select(PerevalAdded.area_id, func.count())
+            .where(PerevalAdded.area_id.is_not(None))
+            .group_by(PerevalAdded.area_id)
+        )
+        return dict(result.all())
+
+    # Асинхронный метод получения перевалов области и всех её подобластей, отсортированных по "id".
+    # Подобласти берутся из таблицы замыкания, поэтому рекурсивный обход дерева не нужен.
+    # Постраничный вывод: "limit" - размер страницы, "after_id" - "id" последнего перевала предыдущей страницы.
+    async def get_perevals_in_area(
+            self,
+            session: AsyncSession,
+            area_id: int,
+            limit: int,
+            after_id: int | None = None
+    ) -> list[RowMapping]:
+        query = (
+            select(*SEARCH_COLUMNS, PerevalAdded.area_id)
+            .join(PerevalAreaClosure, PerevalAreaClosure.descendant_id == PerevalAdded.area_id)
+            .join(Coord, PerevalAdded.coord_id == Coord.id)
+            .where(PerevalAreaClosure.ancestor_id == area_id)
+        )
+        if after_id is not None:
+            query = query.where(PerevalAdded.id > after_id)
+        result = await session.execute(query.order_by(PerevalAdded.id).limit(limit))
+        return list(result.mappings().all())
+
+    # Асинхронный метод получения описания изображения по "id".
+    # Содержимое изображения не загружается, оно лежит в хранилище файлов.
+    async def get_image_on_id(
+            self,
+            session: AsyncSession,
+            image_id: int
+    ) -> PImage | None:
+        return await session.get(PImage, image_id)
+
+    # Асинхронный метод получения пользователя по email.
+    async def get_user_on_email(
             self,
             session: AsyncSession,
             user__email: str
+    ) -> User | None:
+        result = await session.execute(select(User).where(User.email == user__email))
+        return result.scalars().first()
+
+    # Асинхронный метод получения перевалов, добавленных пользователем с запрашиваемым email.
+    # Параметры пагинации и проекции описаны в функции "_perevals_of_user_query".
+    # Данные пользователя берутся из уже загруженного объекта и отдельно не запрашиваются.
+    async def get_perevals_on_email(
+            self,
+            session: AsyncSession,
+            user__email: str,
+            limit: int | None = None,
+            after: tuple[datetime, int] | None = None,
+            columns: list[str] | None = None,
+            with_coords: bool = True,
+            with_images: bool = True
     ) -> List[PerevalAdded]:
         try:
             # Проверить, существует ли пользователь с таким email.
             # Если такого пользователя нет, вызвать исключение.
-            user_result = await session.execute(select(User).where(User.email == user__email))
-            user = user_result.scalars().first()
+            user = await self.get_user_on_email(session, user__email)
             if not user:
                 raise HTTPException(
                     status_code=404,
                     detail="Пользователь с таким email не найден."
                 )
-            # Получить перевал из базы данных, сразу подгрузить значения из связанных моделей.
-            result = await session.execute(
-                select(PerevalAdded)
-                .options(selectinload(PerevalAdded.creator),
-                         selectinload(PerevalAdded.coords),
-                         selectinload(PerevalAdded.images).selectinload(PerevalImage.image))
-                .where(PerevalAdded.creator_id == user.id)
-            )
-            return list(result.scalars().all())
+            query = _perevals_of_user_query(user.id, limit, after, columns, with_coords, with_images)
+            perevals = list((await session.execute(query)).scalars().all())
+            for pereval in perevals:
+                set_committed_value(pereval, 'creator', user)
+            return perevals
         # При возникновении ошибок в работе с базой данных, вызвать исключение.
         except SQLAlchemyError as e:
             raise HTTPException(
@@ -148,89 +728,301 @@ class DatabaseManager:
                 detail=f"Ошибка базы данных: {str(e)}"
             )
 
+    # Асинхронный генератор перевалов пользователя, читающий их курсором на стороне сервера.
+    # В памяти одновременно находится не больше "yield_per" перевалов, связанные модели
+    # подгружаются отдельным запросом на каждую такую порцию.
+    async def stream_perevals_of_user(
+            self,
+            session: AsyncSession,
+            user: User,
+            limit: int | None = None,
+            after: tuple[datetime, int] | None = None,
+            columns: list[str] | None = None,
+            with_coords: bool = True,
+            with_images: bool = True,
+            yield_per: int = 100
+    ) -> AsyncIterator[PerevalAdded]:
+        query = _perevals_of_user_query(user.id, limit, after, columns, with_coords, with_images)
+        result = await session.stream(query.execution_options(yield_per=yield_per))
+        async for pereval in result.scalars():
+            set_committed_value(pereval, 'creator', user)
+            yield pereval
+
     # Асинхронный метод изменения перевала по "id".
+    # Проверка статуса (и версии, если задана "expected_version") и изменение полей перевала
+    # выполняются одним условным запросом UPDATE ... WHERE id AND status AND version,
+    # поэтому модератор или другой редактор не могут изменить перевал между проверкой и записью.
+    # Перевал и связанные модели не загружаются.
+    # Возвращает код "1", "None" и новую версию, если перевал изменён, иначе код "0", сообщение и "None".
+    # Если версия перевала не совпадает с "expected_version", вызвать HTTPException 412.
     async def patch_pereval_on_id(
             self,
             session: AsyncSession,
             pereval_id: int,
             update_data: dict,
-    ) -> tuple[int, str | None]:
-        # Получить перевал из базы данных, сразу подгрузить значения из связанных моделей.
-        result = await session.execute(
-            select(PerevalAdded)
-            .options(selectinload(PerevalAdded.creator),
-                     selectinload(PerevalAdded.coords),
-                     selectinload(PerevalAdded.images).selectinload(PerevalImage.image))
-            .where(PerevalAdded.id == pereval_id))
-        pereval_data = result.scalars().first()
+            expected_version: int | None = None,
+    ) -> tuple[int, str | None, int | None]:
+        # Собрать новые значения полей таблицы "pereval_added".
+        values = {}
+        for key, value in update_data.items():
+            # Убрать информацию о часовом поясе из времени добавления.
+            if key == 'add_time':
+                if value.tzinfo is not None:
+                    value = value.replace(tzinfo=None)
+                values[key] = value
+            # Вынести значения уровней сложности перевала из вложенного словаря "level".
+            elif key == 'level':
+                values.update({
+                    'level_winter': value.get('winter'),
+                    'level_summer': value.get('summer'),
+                    'level_autumn': value.get('autumn'),
+                    'level_spring': value.get('spring')
+                })
+            # Координаты и изображения хранятся в связанных таблицах и обновляются отдельно.
+            elif key not in ('coords', 'images'):
+                values[key] = value
 
-        # Если перевала с запрашиваемым "id" нет, вернуть код "0" и сообщение об ошибке.
-        if not pereval_data:
-            return 0, "Перевал не найден."
-
-        # Если статус перевала с запрашиваемым "id" не "Ожидает модерации",
-        # вернуть код "0" и сообщение об ошибке.
-        if pereval_data.status != StatusPereval.NEW:
-            return 0, (f"Редактирование невозможно. Текущий статус '{pereval_data.status}'."
-                       f"Для редактирования должен быть статус 'Ожидает модерации'.")
+        conditions = [PerevalAdded.id == pereval_id, PerevalAdded.status == StatusPereval.NEW]
+        if expected_version is not None:
+            conditions.append(PerevalAdded.version == expected_version)
         try:
-            # Обновить поля перевала
-            for key, value in update_data.items():
-                # Заменить поле с временем добавления в базу данных
-                # и убрать информацию о часовом поясе.
-                if key == 'add_time':
-                    if value.tzinfo is not None:
-                        value = value.replace(tzinfo=None)
-                    setattr(pereval_data, key, value)
-                # Заменить значения координат перевала.
-                elif key == 'coords':
-                    await session.execute(
-                        update(Coord)
-                        .where(Coord.id == pereval_data.coord_id)
-                        .values(**value)
-                    )
-                # Заменить значения уровней сложности перевала.
-                elif key == 'level':
-                    level_data = {
-                        'level_winter': value.get('winter'),
-                        'level_summer': value.get('summer'),
-                        'level_autumn': value.get('autumn'),
-                        'level_spring': value.get('spring')
-                    }
-                    await session.execute(
-                        update(PerevalAdded)
-                        .where(PerevalAdded.id == pereval_id)
-                        .values(**level_data)
-                    )
-                # Заменить изображения перевала.
-                elif key == 'images':
-                    # Удалить старые изображения. Нужно делать явно из-за связи многие-ко-многим.
+            # Изменить перевал и увеличить его версию, если он всё ещё доступен для редактирования.
+            row = (await session.execute(
+                update(PerevalAdded)
+                .where(*conditions)
+                .values(**values, **_change_values())
+                .returning(PerevalAdded.version, PerevalAdded.coord_id)
+            )).first()
+
+            # Если перевал не изменён, узнать причину лёгким запросом.
+            if row is None:
+                await session.rollback()
+                current = (await session.execute(
+                    select(PerevalAdded.status, PerevalAdded.version).where(PerevalAdded.id == pereval_id)
+                )).first()
+                # Если перевала с запрашиваемым "id" нет, вернуть код "0" и сообщение об ошибке.
+                if current is None:
+                    return 0, "Перевал не найден.", None
+                # Если статус перевала с запрашиваемым "id" не "Ожидает модерации",
+                # вернуть код "0" и сообщение об ошибке.
+                if current.status != StatusPereval.NEW:
+                    return 0, (f"Редактирование невозможно. Текущий статус '{current.status}'."
+                               f"Для редактирования должен быть статус 'Ожидает модерации'."), None
+                # Иначе перевал изменён после того, как клиент получил версию "expected_version".
+                raise HTTPException(
+                    status_code=412,
+                    detail=f"Перевал изменён другим пользователем. Текущая версия {current.version}."
+                )
+            new_version, coord_id = row
+
+            # Заменить значения координат перевала.
+            if 'coords' in update_data:
+                await session.execute(
+                    update(Coord)
+                    .where(Coord.id == coord_id)
+                    .values(**update_data['coords'])
+                )
+            # Заменить изображения перевала.
+            if 'images' in update_data:
+                # Удалить старые изображения. Нужно делать явно из-за связи многие-ко-многим.
+                removed_image_ids = (await session.scalars(
+                    delete(PerevalImage)
+                    .where(PerevalImage.pereval_id == pereval_id)
+                    .returning(PerevalImage.image_id)
+                )).all()
+                # Сохранить записи об удалённых изображениях для клиентов синхронизации.
+                if removed_image_ids:
                     await session.execute(
-                        delete(PerevalImage).where(PerevalImage.pereval_id == pereval_id)
+                        insert(PerevalImageTombstone),
+                        [{'pereval_id': pereval_id, 'image_id': image_id} for image_id in removed_image_ids]
                     )
-                    # Добавить новые изображения.
-                    for img_data in value:
-                        try:
-                            img_bytes = base64.b64decode(img_data['data'])
-                        except Exception:
-                            img_bytes = img_data['data'].encode('utf-8')
-                        image = PImage(title=img_data['title'], img=img_bytes)
-                        session.add(image)
-                        await session.flush()
-                        pereval_image = PerevalImage(
-                            pereval_id=pereval_id,
-                            image_id=image.id
-                        )
-                        session.add(pereval_image)
-                # Т.к. остальные поля не имеют связанных моделей и не требуют дополнительной обработки,
-                # просто заменить в них значения.
-                else:
-                    setattr(pereval_data, key, value)
+                # Добавить новые изображения.
+                await self._insert_images(session, [(pereval_id, img_data) for img_data in update_data['images']])
 
             # Закрыть сессию работы с базой данных.
             await session.commit()
-            return 1, None
+            # Удалить из кеша устаревшие ответы о перевале.
+            await invalidate_pereval(pereval_id, new_version - 1)
+            return 1, None, new_version
+        except HTTPException:
+            raise
         # При возникновении ошибки, откатить все изменения в базе данных в текущей сессии
         except Exception as e:
             await session.rollback()
-            return 0, f"Ошибка обновления: {str(e)}"
+            return 0, f"Ошибка обновления: {str(e)}", None
+
+    # Асинхронный метод, забирающий на модерацию до "limit" перевалов со статусом "Ожидает модерации".
+    # Выбор и смена статуса на "На модерации" выполняются одним запросом; строки, заблокированные
+    # другими модераторами, пропускаются (SKIP LOCKED), поэтому один перевал не достанется двоим.
+    # Возвращает краткие данные забранных перевалов.
+    async def claim_perevals_for_moderation(
+            self,
+            session: AsyncSession,
+            limit: int
+    ) -> list[RowMapping]:
+        candidates = (
+            select(PerevalAdded.id)
+            .where(PerevalAdded.status == StatusPereval.NEW)
+            .order_by(PerevalAdded.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        rows = (await session.execute(
+            update(PerevalAdded)
+            .where(PerevalAdded.id.in_(candidates.scalar_subquery()))
+            .values(status=StatusPereval.PENDING, **_change_values())
+            .returning(
+                PerevalAdded.id,
+                PerevalAdded.beauty_title,
+                PerevalAdded.title,
+                PerevalAdded.add_time,
+                PerevalAdded.version
+            )
+        )).mappings().all()
+        await session.commit()
+        # Удалить из кеша ответы о перевалах с прежним статусом.
+        for row in rows:
+            await invalidate_pereval(row['id'], row['version'] - 1)
+        return sorted(rows, key=lambda row: row['id'])
+
+    # Асинхронный метод смены статуса перевалов из списка "id" одним запросом.
+    # Меняется статус только тех перевалов, текущий статус которых входит в "from_statuses".
+    # Возвращает "id" перевалов, статус которых изменён.
+    async def set_perevals_status(
+            self,
+            session: AsyncSession,
+            pereval_ids: list[int],
+            from_statuses: tuple[StatusPereval, ...],
+            to_status: StatusPereval
+    ) -> list[int]:
+        rows = (await session.execute(
+            update(PerevalAdded)
+            .where(PerevalAdded.id.in_(pereval_ids), PerevalAdded.status.in_(from_statuses))
+            .values(status=to_status, **_change_values())
+            .returning(PerevalAdded.id, PerevalAdded.version)
+        )).all()
+        await session.commit()
+        # Удалить из кеша ответы о перевалах с прежним статусом.
+        for pereval_id, version in rows:
+            await invalidate_pereval(pereval_id, version - 1)
+        return sorted(pereval_id for pereval_id, _ in rows)
+
+    # Асинхронный метод постановки задачи в очередь. Транзакцию не закрывает,
+    # поэтому задача появится в очереди только вместе с остальными изменениями транзакции.
+    async def enqueue_job(
+            self,
+            session: AsyncSession,
+            kind: str,
+            payload: dict,
+            max_attempts: int | None = None
+    ) -> int:
+        values = {'kind': kind, 'payload': payload}
+        if max_attempts is not None:
+            values['max_attempts'] = max_attempts
+        return await session.scalar(insert(Job).values(**values).returning(Job.id))
+
+    # Асинхронный метод, забирающий из очереди до "limit" задач, готовых к выполнению,
+    # а также задачи, зависшие в обработке дольше "lock_timeout" секунд (обработчик завершился аварийно).
+    # Строки, заблокированные другими обработчиками, пропускаются (SKIP LOCKED).
+    # Задачи помечаются как выполняемые, и транзакция сразу закрывается, чтобы не держать блокировки.
+    async def claim_jobs(
+            self,
+            session: AsyncSession,
+            limit: int,
+            lock_timeout: float
+    ) -> list[Row]:
+        candidates = (
+            select(Job.id)
+            .where(or_(
+                and_(Job.status == StatusJob.QUEUED, Job.run_after <= func.now()),
+                and_(Job.status == StatusJob.RUNNING, Job.locked_at < func.now() - timedelta(seconds=lock_timeout)),
+            ))
+            .order_by(Job.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        jobs = (await session.execute(
+            update(Job)
+            .where(Job.id.in_(candidates.scalar_subquery()))
+            .values(status=StatusJob.RUNNING, locked_at=func.now(), attempts=Job.attempts + 1)
+            .returning(Job.id, Job.kind, Job.payload, Job.attempts, Job.max_attempts)
+        )).all()
+        await session.commit()
+        return sorted(jobs, key=lambda job: job.id)
+
+    # Асинхронный метод, отмечающий начало выполнения задачи: время блокировки обновляется,
+    # чтобы задача, дождавшаяся своей очереди в пачке, не считалась зависшей.
+    # Возвращает "False", если задачу уже забрал другой обработчик.
+    async def start_job(
+            self,
+            session: AsyncSession,
+            job: Row
+    ) -> bool:
+        job_id = await session.scalar(
+            update(Job)
+            .where(_job_owned(job))
+            .values(locked_at=func.now())
+            .returning(Job.id)
+        )
+        await session.commit()
+        return job_id is not None
+
+    # Асинхронный метод, отмечающий задачу выполненной. Транзакцию не закрывает,
+    # чтобы результат задачи и отметка о выполнении сохранялись вместе.
+    # Данные задачи больше не нужны и удаляются.
+    # Возвращает "False", если задачу уже забрал другой обработчик: тогда транзакцию нужно откатить.
+    async def complete_job(
+            self,
+            session: AsyncSession,
+            job: Row
+    ) -> bool:
+        job_id = await session.scalar(
+            update(Job)
+            .where(_job_owned(job))
+            .values(status=StatusJob.DONE, locked_at=None, last_error=None, payload=None)
+            .returning(Job.id)
+        )
+        return job_id is not None
+
+    # Асинхронный метод, записывающий ошибку выполнения задачи.
+    # Если попытки не исчерпаны, задача возвращается в очередь с задержкой "retry_delay" секунд,
+    # иначе помечается как невыполненная. Если задачу уже забрал другой обработчик, она не меняется.
+    async def fail_job(
+            self,
+            session: AsyncSession,
+            job: Row,
+            error: str,
+            retry_delay: float
+    ) -> None:
+        retry = job.attempts < job.max_attempts
+        await session.execute(
+            update(Job)
+            .where(_job_owned(job))
+            .values(
+                status=StatusJob.QUEUED if retry else StatusJob.FAILED,
+                run_after=func.now() + timedelta(seconds=retry_delay),
+                locked_at=None,
+                last_error=error,
+            )
+        )
+        await session.commit()
+
+    # Асинхронный метод удаления выполненных и невыполненных задач, созданных более "retention" секунд назад.
+    # Возвращает количество удалённых задач и ключи временных файлов с изображениями,
+    # оставшихся от невыполненных задач (у выполненных данные задачи уже удалены).
+    async def delete_finished_jobs(
+            self,
+            session: AsyncSession,
+            retention: float
+    ) -> tuple[int, list[str]]:
+        payloads = (await session.scalars(
+            delete(Job)
+            .where(
+                Job.status.in_((StatusJob.DONE, StatusJob.FAILED)),
+                Job.created_at < func.now() - timedelta(seconds=retention)
+            )
+            .returning(Job.payload)
+        )).all()
+        await session.commit()
+        staged_keys = [payload['staged_key'] for payload in payloads if payload and 'staged_key' in payload]
+        return len(payloads), staged_keys
@@ -0,0 +1,96 @@
+import asyncio
+import json
+import logging
+from typing import Awaitable, Callable
+
+import httpx
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import invalidate_pereval
+from app.core.config import settings
+from app.db.repositories.pereval import DatabaseManager
+from app.storage.blob_store import blob_store
+from app.storage.image_codec import store_image, UnsupportedImageError
+from app.storage.image_variants import generate_variants, variants_available
+
+
+# Обработчик задачи получает сессию и данные задачи и выполняет работу, не закрывая транзакцию:
+# её закрывает обработчик очереди вместе с отметкой о выполнении задачи.
+# Может вернуть функцию, которую нужно вызвать после успешного коммита (например, сброс кеша).
+AfterCommit = Callable[[], Awaitable[None]]
+JobHandler = Callable[[AsyncSession, dict], Awaitable[AfterCommit | None]]
+
+
+# Прочитать изображения перевала, сохранённые POST /submit_data/async во временный файл хранилища.
+# Задачи, поставленные до появления временных файлов, содержат изображения прямо в "images".
+async def _load_staged_images(payload: dict) -> list[dict]:
+    if 'staged_key' not in payload:
+        return payload['images']
+    data = await blob_store.get(payload['staged_key'])
+    return await asyncio.to_thread(json.loads, data)
+
+
+# Обработать изображения перевала, добавленного через POST /submit_data/async:
+# декодировать их из base64, проверить формат (файлы неизвестного формата не сохраняются),
+# сохранить в хранилище файлов с хешем, размером и MIME-типом, привязать к перевалу
+# и поставить в очередь уведомление о новом перевале.
+# После коммита удалить временный файл с исходными изображениями.
+async def process_pereval_images(session: AsyncSession, payload: dict) -> AfterCommit | None:
+    pereval_id = payload['pereval_id']
+    images = []
+    rejected = []
+    for image in await _load_staged_images(payload):
+        try:
+            images.append(await store_image(image, require_image=True))
+        except UnsupportedImageError as e:
+            logging.warning(f"Перевал {pereval_id}: {e} Изображение не сохранено.")
+            rejected.append(image['title'])
+
+    db_manager = DatabaseManager()
+    old_version = await db_manager.attach_pereval_images(session, pereval_id, images)
+    if old_version is None:
+        logging.warning(f"Перевал {pereval_id} не найден, изображения не сохранены.")
+    else:
+        await db_manager.enqueue_job(session, 'pereval_submitted', {
+            'pereval_id': pereval_id,
+            'images': len(images),
+            'rejected_images': rejected,
+        })
+
+    # Удалить временный файл и из кеша ответы о перевале без изображений.
+    async def after_commit() -> None:
+        if 'staged_key' in payload:
+            await blob_store.delete(payload['staged_key'])
+        if old_version is not None:
+            await invalidate_pereval(pereval_id, old_version)
+    return after_commit
+
+
+# Уведомить о новом перевале, ожидающем модерации.
+# Если задан NOTIFY_WEBHOOK_URL, данные задачи отправляются на него POST-запросом в формате JSON;
+# при ошибке задача повторяется очередью. Иначе уведомление только пишется в лог.
+async def notify_pereval_submitted(session: AsyncSession, payload: dict) -> AfterCommit | None:
+    logging.info(f"Перевал {payload['pereval_id']} добавлен и ожидает модерации.")
+    if settings.NOTIFY_WEBHOOK_URL:
+        async with httpx.AsyncClient(timeout=settings.NOTIFY_WEBHOOK_TIMEOUT) as client:
+            response = await client.post(
+                settings.NOTIFY_WEBHOOK_URL, json={'event': 'pereval_submitted', **payload}
+            )
+            response.raise_for_status()
+    return None
+
+
+# Создать уменьшенные копии нового изображения. Задача ставится вместе со вставкой изображения.
+# Если создание копий выключено или Pillow не установлен, задача завершается без работы.
+async def make_image_variants(session: AsyncSession, payload: dict) -> AfterCommit | None:
+    if variants_available():
+        await generate_variants(payload['sha256'])
+    return None
+
+
+# Обработчики по типу задачи (поле "kind" таблицы "jobs").
+HANDLERS: dict[str, JobHandler] = {
+    'pereval_images': process_pereval_images,
+    'pereval_submitted': notify_pereval_submitted,
+    'image_variants': make_image_variants,
+}
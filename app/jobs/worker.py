@@ -0,0 +1,108 @@
+# Обработчик очереди фоновых задач (таблица "jobs").
+#
+# Запуск (можно запустить несколько процессов, задачи между ними не повторяются):
+#     python -m app.jobs.worker
+#
+# Задачи забираются пачками запросом SELECT ... FOR UPDATE SKIP LOCKED.
+# Каждая задача выполняется в своей транзакции вместе с отметкой о выполнении.
+# При ошибке задача возвращается в очередь с растущей задержкой, пока не исчерпаны попытки.
+# Завершённые задачи удаляются через JOB_RETENTION секунд после создания.
+import asyncio
+import logging
+import time
+
+from sqlalchemy import Row
+
+from app.core.config import settings
+from app.db.database import async_session_maker, engine
+from app.db.repositories.pereval import DatabaseManager
+from app.jobs.handlers import HANDLERS
+from app.storage.blob_store import blob_store
+
+
+# Задержка перед повтором задачи: удваивается с каждой попыткой, но не больше часа.
+def retry_delay(attempts: int) -> float:
+    return min(settings.JOB_RETRY_DELAY * 2 ** (attempts - 1), 3600)
+
+
+# Выполнить одну задачу. Ошибки не пробрасываются, а записываются в задачу.
+# Если задачу, пока она ждала в пачке или выполнялась, забрал другой обработчик,
+# её результат откатывается, чтобы задача не была выполнена дважды.
+async def run_job(job: Row) -> None:
+    db_manager = DatabaseManager()
+    async with async_session_maker() as session:
+        if not await db_manager.start_job(session, job):
+            logging.warning(f"Задача {job.id} ({job.kind}) уже забрана другим обработчиком, пропущена.")
+            return
+        try:
+            handler = HANDLERS.get(job.kind)
+            if handler is None:
+                raise LookupError(f"Неизвестный тип задачи: {job.kind}")
+            after_commit = await handler(session, job.payload)
+            if not await db_manager.complete_job(session, job):
+                await session.rollback()
+                logging.warning(f"Задача {job.id} ({job.kind}) забрана другим обработчиком, результат отменён.")
+                return
+            await session.commit()
+        except Exception as e:
+            await session.rollback()
+            logging.warning(f"Задача {job.id} ({job.kind}), попытка {job.attempts}: {e}")
+            await db_manager.fail_job(session, job, f"{type(e).__name__}: {e}", retry_delay(job.attempts))
+            return
+    if after_commit is not None:
+        try:
+            await after_commit()
+        except Exception as e:
+            logging.warning(f"Задача {job.id} ({job.kind}) выполнена, но действие после коммита не удалось: {e}")
+
+
+# Удалить старые завершённые задачи. Ошибки не пробрасываются.
+async def cleanup_jobs() -> None:
+    try:
+        async with async_session_maker() as session:
+            deleted, staged_keys = await DatabaseManager().delete_finished_jobs(session, settings.JOB_RETENTION)
+        # Удалить временные файлы с изображениями невыполненных задач.
+        for key in staged_keys:
+            await blob_store.delete(key)
+        if deleted:
+            logging.info(f"Удалено завершённых задач: {deleted}")
+    except Exception as e:
+        logging.warning(f"Не удалось удалить завершённые задачи: {e}")
+
+
+# Забирать и выполнять задачи, пока не установлено событие "stop".
+# Если задач нет, ждать JOB_POLL_INTERVAL секунд.
+# Раз в JOB_CLEANUP_INTERVAL секунд удалять старые завершённые задачи.
+async def run_worker(stop: asyncio.Event | None = None) -> None:
+    stop = stop or asyncio.Event()
+    db_manager = DatabaseManager()
+    next_cleanup = time.monotonic()
+    while not stop.is_set():
+        if time.monotonic() >= next_cleanup:
+            await cleanup_jobs()
+            next_cleanup = time.monotonic() + settings.JOB_CLEANUP_INTERVAL
+        try:
+            async with async_session_maker() as session:
+                jobs = await db_manager.claim_jobs(session, settings.JOB_BATCH_SIZE, settings.JOB_LOCK_TIMEOUT)
+        except Exception as e:
+            logging.error(f"Не удалось получить задачи из очереди: {e}")
+            jobs = []
+        for job in jobs:
+            await run_job(job)
+        if not jobs:
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=settings.JOB_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+
+async def main() -> None:
+    try:
+        await run_worker()
+    finally:
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,328 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, BinaryIO, Iterator
+
+from app.core.config import settings
+
+
+# Ошибка: файл больше допустимого размера.
+class FileTooLargeError(ValueError):
+    pass
+
+
+# Определить MIME-тип изображения по первым байтам файла.
+def guess_mime_type(data: bytes) -> str:
+    if data.startswith(b'\xff\xd8\xff'):
+        return 'image/jpeg'
+    if data.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'image/png'
+    if data[:6] in (b'GIF87a', b'GIF89a'):
+        return 'image/gif'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'application/octet-stream'
+
+
+# Базовый класс хранилища файлов, адресуемых по содержимому.
+# Ключ файла - SHA-256 его содержимого, поэтому одинаковые файлы хранятся один раз.
+# Синхронные методы используются в миграциях Alembic,
+# асинхронные выполняют их в пуле потоков, не блокируя цикл событий.
+class BlobStore(ABC):
+
+    # Сохранить файл по ключу.
+    @abstractmethod
+    def put_sync(self, key: str, data: bytes, mime_type: str) -> None:
+        ...
+
+    # Прочитать файл по ключу. Если файла нет, вызвать "KeyError".
+    @abstractmethod
+    def get_sync(self, key: str) -> bytes:
+        ...
+
+    # Проверить, есть ли файл с таким ключом.
+    @abstractmethod
+    def exists_sync(self, key: str) -> bool:
+        ...
+
+    # Удалить файл по ключу, если он есть.
+    @abstractmethod
+    def delete_sync(self, key: str) -> None:
+        ...
+
+    # Получить размер файла в байтах. Если файла нет, вызвать "KeyError".
+    # Базовая реализация читает файл целиком, наследники получают размер из метаданных.
+    def size_sync(self, key: str) -> int:
+        return len(self.get_sync(key))
+
+    # Прочитать байты файла с "start" по "end" включительно кусками по "chunk_size" байт.
+    # Базовая реализация читает файл целиком, наследники читают только нужную часть.
+    def iter_range_sync(self, key: str, start: int, end: int, chunk_size: int) -> Iterator[bytes]:
+        data = self.get_sync(key)
+        for offset in range(start, end + 1, chunk_size):
+            yield data[offset:min(offset + chunk_size, end + 1)]
+
+    # Сохранить файл, если его ещё нет в хранилище. Вернуть ключ файла.
+    def add_sync(self, data: bytes, mime_type: str | None = None) -> str:
+        key = hashlib.sha256(data).hexdigest()
+        if not self.exists_sync(key):
+            self.put_sync(key, data, mime_type or guess_mime_type(data))
+        return key
+
+    # Сохранить файл из файлового объекта, читая его кусками по "chunk_size" байт,
+    # чтобы большой файл не загружался в память целиком.
+    # Если файл больше "max_size" байт, вызвать "FileTooLargeError". Вернуть ключ, размер и MIME-тип файла.
+    def add_stream_sync(
+            self,
+            fileobj: BinaryIO,
+            max_size: int | None = None,
+            chunk_size: int = 1024 * 1024
+    ) -> tuple[str, int, str]:
+        with tempfile.TemporaryFile() as tmp:
+            key, size, head = _copy_hashed(fileobj, tmp, max_size, chunk_size)
+            mime_type = guess_mime_type(head)
+            if not self.exists_sync(key):
+                tmp.seek(0)
+                self.put_file_sync(key, tmp, mime_type)
+        return key, size, mime_type
+
+    # Сохранить файл по ключу из файлового объекта.
+    # Базовая реализация читает файл целиком, наследники передают его в хранилище по частям.
+    def put_file_sync(self, key: str, fileobj: BinaryIO, mime_type: str) -> None:
+        self.put_sync(key, fileobj.read(), mime_type)
+
+    async def add(self, data: bytes, mime_type: str | None = None) -> str:
+        return await asyncio.to_thread(self.add_sync, data, mime_type)
+
+    async def add_stream(self, fileobj: BinaryIO, max_size: int | None = None) -> tuple[str, int, str]:
+        return await asyncio.to_thread(self.add_stream_sync, fileobj, max_size)
+
+    async def put(self, key: str, data: bytes, mime_type: str) -> None:
+        await asyncio.to_thread(self.put_sync, key, data, mime_type)
+
+    async def get(self, key: str) -> bytes:
+        return await asyncio.to_thread(self.get_sync, key)
+
+    async def size(self, key: str) -> int:
+        return await asyncio.to_thread(self.size_sync, key)
+
+    async def exists(self, key: str) -> bool:
+        return await asyncio.to_thread(self.exists_sync, key)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self.delete_sync, key)
+
+    # Асинхронно отдавать куски файла, читая каждый из них в пуле потоков.
+    async def iter_range(self, key: str, start: int, end: int, chunk_size: int = 64 * 1024) -> AsyncIterator[bytes]:
+        iterator = self.iter_range_sync(key, start, end, chunk_size)
+        try:
+            while True:
+                chunk = await asyncio.to_thread(next, iterator, None)
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            iterator.close()
+
+
+# Хранилище файлов в локальной файловой системе.
+# Файлы раскладываются по вложенным каталогам из первых символов хеша: "ab/cd/abcd...".
+class LocalBlobStore(BlobStore):
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key[2:4], key)
+
+    def put_sync(self, key: str, data: bytes, mime_type: str) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Записать во временный файл и атомарно переименовать,
+        # чтобы параллельные читатели не увидели недописанный файл.
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    # Записать поток сразу во временный файл в каталоге хранилища, считая хеш,
+    # и переименовать его по хешу, чтобы не копировать файл второй раз.
+    def add_stream_sync(
+            self,
+            fileobj: BinaryIO,
+            max_size: int | None = None,
+            chunk_size: int = 1024 * 1024
+    ) -> tuple[str, int, str]:
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root)
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                key, size, head = _copy_hashed(fileobj, tmp, max_size, chunk_size)
+            path = self._path(key)
+            if os.path.exists(path):
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return key, size, guess_mime_type(head)
+
+    def get_sync(self, key: str) -> bytes:
+        try:
+            with open(self._path(key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            raise KeyError(key)
+
+    def size_sync(self, key: str) -> int:
+        try:
+            return os.path.getsize(self._path(key))
+        except FileNotFoundError:
+            raise KeyError(key)
+
+    def iter_range_sync(self, key: str, start: int, end: int, chunk_size: int) -> Iterator[bytes]:
+        try:
+            f = open(self._path(key), 'rb')
+        except FileNotFoundError:
+            raise KeyError(key)
+        with f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    def exists_sync(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def delete_sync(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+# Хранилище файлов в S3-совместимом сервисе.
+# Принимает любой клиент с интерфейсом boto3 (put_object, get_object, head_object, delete_object),
+# поэтому локально можно использовать MinIO или собственную заглушку.
+class S3BlobStore(BlobStore):
+
+    def __init__(self, client, bucket: str, prefix: str = ''):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key[:2]}/{key[2:4]}/{key}"
+
+    def put_sync(self, key: str, data: bytes, mime_type: str) -> None:
+        self.client.put_object(Bucket=self.bucket, Key=self._key(key), Body=data, ContentType=mime_type)
+
+    def put_file_sync(self, key: str, fileobj: BinaryIO, mime_type: str) -> None:
+        self.client.put_object(Bucket=self.bucket, Key=self._key(key), Body=fileobj, ContentType=mime_type)
+
+    def get_sync(self, key: str) -> bytes:
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self._key(key))
+        except Exception as e:
+            if _is_s3_not_found(e):
+                raise KeyError(key)
+            raise
+        return response['Body'].read()
+
+    def iter_range_sync(self, key: str, start: int, end: int, chunk_size: int) -> Iterator[bytes]:
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self._key(key), Range=f"bytes={start}-{end}")
+        except Exception as e:
+            if _is_s3_not_found(e):
+                raise KeyError(key)
+            raise
+        body = response['Body']
+        try:
+            yield from body.iter_chunks(chunk_size)
+        finally:
+            body.close()
+
+    def size_sync(self, key: str) -> int:
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._key(key))['ContentLength']
+        except Exception as e:
+            if _is_s3_not_found(e):
+                raise KeyError(key)
+            raise
+
+    def exists_sync(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except Exception as e:
+            if _is_s3_not_found(e):
+                return False
+            raise
+        return True
+
+    def delete_sync(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+
+# Скопировать поток "src" в "dst" кусками, считая SHA-256 и размер.
+# Вернуть ключ, размер и первые байты файла для определения MIME-типа.
+# Если размер превысит "max_size", вызвать "FileTooLargeError", не дочитывая поток.
+def _copy_hashed(src: BinaryIO, dst: BinaryIO, max_size: int | None, chunk_size: int) -> tuple[str, int, bytes]:
+    sha256 = hashlib.sha256()
+    size = 0
+    head = b''
+    while chunk := src.read(chunk_size):
+        size += len(chunk)
+        if max_size is not None and size > max_size:
+            raise FileTooLargeError(f"Файл больше {max_size} байт.")
+        if len(head) < 16:
+            head += chunk[:16 - len(head)]
+        sha256.update(chunk)
+        dst.write(chunk)
+    return sha256.hexdigest(), size, head
+
+
+# Проверить, означает ли ошибка клиента S3 отсутствие объекта.
+def _is_s3_not_found(error: Exception) -> bool:
+    if isinstance(error, (KeyError, FileNotFoundError)):
+        return True
+    code = getattr(error, 'response', {}).get('Error', {}).get('Code')
+    return code in ('404', 'NoSuchKey', 'NotFound')
+
+
+# Создать хранилище файлов по настройкам приложения.
+def create_blob_store() -> BlobStore:
+    if settings.BLOB_STORAGE_BACKEND == 'local':
+        return LocalBlobStore(settings.BLOB_STORAGE_PATH)
+    if settings.BLOB_STORAGE_BACKEND == 's3':
+        # boto3 нужен только для хранилища S3, поэтому импортируется здесь.
+        try:
+            import boto3
+        except ImportError:
+            raise RuntimeError("Для BLOB_STORAGE_BACKEND=s3 установите пакет boto3.")
+        client = boto3.client(
+            's3',
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            region_name=settings.S3_REGION,
+            aws_access_key_id=settings.S3_ACCESS_KEY,
+            aws_secret_access_key=settings.S3_SECRET_KEY,
+        )
+        return S3BlobStore(client, settings.S3_BUCKET, settings.S3_PREFIX)
+    raise ValueError(f"Неизвестное хранилище файлов: {settings.BLOB_STORAGE_BACKEND}")
+
+
+# Сохранить хранилище файлов в переменную.
+blob_store = create_blob_store()
@@ -0,0 +1,77 @@
+import asyncio
+import base64
+import time
+
+from app.core.config import settings
+from app.core.metrics import IMAGE_PROCESSING_DURATION
+from app.storage.blob_store import blob_store, guess_mime_type, FileTooLargeError
+
+
+# Данные длиннее этого значения (в байтах) кодируются и декодируются в пуле потоков,
+# короткие - сразу, т.к. передача в поток дороже самой операции.
+OFFLOAD_THRESHOLD = 64 * 1024
+
+
+# Ошибка: содержимое изображения не распознано как изображение известного формата.
+class UnsupportedImageError(ValueError):
+    pass
+
+
+# Проверить размер изображения. Если оно больше MAX_IMAGE_SIZE, вызвать "FileTooLargeError".
+def check_image_size(size: int) -> None:
+    if size > settings.MAX_IMAGE_SIZE:
+        raise FileTooLargeError(f"Изображение больше допустимого размера {settings.MAX_IMAGE_SIZE} байт.")
+
+
+# Преобразовать изображение из base64 в байты.
+# Если строка не в формате base64, сохранить её как есть.
+def _decode_sync(data: str) -> bytes:
+    try:
+        return base64.b64decode(data)
+    except Exception:
+        return data.encode('utf-8')
+
+
+def _encode_sync(data: bytes) -> str:
+    return base64.b64encode(data).decode('utf-8')
+
+
+# Декодировать изображение из base64, не блокируя цикл событий на больших изображениях.
+# Размер проверяется до декодирования по длине строки.
+async def decode_image(data: str) -> bytes:
+    check_image_size(len(data) * 3 // 4)
+    started = time.perf_counter()
+    if len(data) > OFFLOAD_THRESHOLD:
+        content = await asyncio.to_thread(_decode_sync, data)
+    else:
+        content = _decode_sync(data)
+    IMAGE_PROCESSING_DURATION.observe(time.perf_counter() - started, operation="decode")
+    return content
+
+
+# Закодировать изображение в base64, не блокируя цикл событий на больших изображениях.
+async def encode_image(data: bytes) -> str:
+    started = time.perf_counter()
+    if len(data) > OFFLOAD_THRESHOLD:
+        encoded = await asyncio.to_thread(_encode_sync, data)
+    else:
+        encoded = _encode_sync(data)
+    IMAGE_PROCESSING_DURATION.observe(time.perf_counter() - started, operation="encode")
+    return encoded
+
+
+# Сохранить изображение в хранилище файлов и вернуть строку для таблицы "p_images".
+# Изображение в base64 ("data") декодируется вне цикла событий.
+# Изображение, уже сохранённое потоком из multipart-запроса, передаётся с ключом "sha256".
+# Если "require_image", файл неизвестного формата не сохраняется, а вызывается "UnsupportedImageError".
+async def store_image(image: dict, require_image: bool = False) -> dict:
+    if 'sha256' in image:
+        return {key: image[key] for key in ('title', 'sha256', 'size', 'mime_type')}
+    content = await decode_image(image['data'])
+    mime_type = guess_mime_type(content)
+    if require_image and not mime_type.startswith('image/'):
+        raise UnsupportedImageError(f"Изображение \"{image['title']}\" имеет неизвестный формат.")
+    started = time.perf_counter()
+    key = await blob_store.add(content, mime_type)
+    IMAGE_PROCESSING_DURATION.observe(time.perf_counter() - started, operation="store")
+    return {'title': image['title'], 'sha256': key, 'size': len(content), 'mime_type': mime_type}
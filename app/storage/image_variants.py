@@ -0,0 +1,116 @@
+import asyncio
+import io
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from app.core.config import settings
+from app.core.metrics import IMAGE_PROCESSING_DURATION
+from app.storage.blob_store import blob_store
+
+
+# Уменьшенные копии изображений: название и наибольшая сторона в пикселях.
+IMAGE_VARIANTS = {
+    "thumb": 320,
+    "medium": 1280,
+}
+# Значения параметра запроса "image_variant": исходное изображение или одна из копий.
+IMAGE_VARIANT_NAMES = ("original", *IMAGE_VARIANTS)
+# Копии сохраняются в формате JPEG.
+VARIANT_MIME_TYPE = "image/jpeg"
+
+
+# Ключ копии изображения в хранилище файлов.
+# Копия однозначно определяется исходным файлом и размером, поэтому хранится рядом с ним без записи в базе.
+def variant_key(sha256: str, variant: str) -> str:
+    return f"{sha256}-{variant}-{IMAGE_VARIANTS[variant]}"
+
+
+# Создать уменьшенные копии изображения. Выполняется в отдельном процессе пула.
+# Вернуть словарь "название копии - содержимое в JPEG".
+# Копии не больше исходного изображения не создаются.
+def _make_variants_sync(data: bytes, sizes: dict[str, int], quality: int) -> dict[str, bytes]:
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as image:
+        # Повернуть изображение по EXIF, т.к. метаданные в копиях не сохраняются.
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        variants = {}
+        for name, max_side in sizes.items():
+            if max(image.size) <= max_side:
+                continue
+            resized = image.copy()
+            resized.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+            buffer = io.BytesIO()
+            resized.save(buffer, format="JPEG", quality=quality, optimize=True, progressive=True)
+            variants[name] = buffer.getvalue()
+        return variants
+
+
+# Пул процессов для обработки изображений. Создаётся при первом использовании.
+_executor: ProcessPoolExecutor | None = None
+
+
+# Установлен ли Pillow. Проверяется при первом использовании.
+_pillow_installed: bool | None = None
+
+
+# Проверить, можно ли создавать копии: включено ли это в настройках и установлен ли Pillow.
+def variants_available() -> bool:
+    global _pillow_installed
+    if not settings.IMAGE_VARIANTS_ENABLED:
+        return False
+    if _pillow_installed is None:
+        # Pillow нужен только для создания копий, поэтому импортируется здесь.
+        try:
+            import PIL  # noqa: F401
+            _pillow_installed = True
+        except ImportError:
+            logging.warning("Пакет Pillow не установлен, уменьшенные копии изображений не создаются.")
+            _pillow_installed = False
+    return _pillow_installed
+
+
+# Процессы пула запускаются через forkserver (или spawn, где его нет), а не fork:
+# копия процесса с работающими потоками (пул потоков asyncio) может унаследовать захваченные блокировки.
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.IMAGE_WORKERS, mp_context=multiprocessing.get_context(method)
+        )
+    return _executor
+
+
+# Создать и сохранить недостающие копии изображения с ключом "sha256".
+# Выполняется обработчиком очереди задач (задача "image_variants"), поэтому при ошибке повторяется.
+async def generate_variants(sha256: str) -> None:
+    missing = {
+        name: max_side
+        for name, max_side in IMAGE_VARIANTS.items()
+        if not await blob_store.exists(variant_key(sha256, name))
+    }
+    if not missing:
+        return
+    data = await blob_store.get(sha256)
+    started = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    variants = await loop.run_in_executor(
+        _get_executor(), _make_variants_sync, data, missing, settings.IMAGE_VARIANT_QUALITY
+    )
+    IMAGE_PROCESSING_DURATION.observe(time.perf_counter() - started, operation="resize")
+    for name, content in variants.items():
+        await blob_store.put(variant_key(sha256, name), content, VARIANT_MIME_TYPE)
+
+
+# Найти сохранённую копию изображения. Вернуть её ключ или "None",
+# если запрошено исходное изображение, копия ещё не создана или не нужна (изображение меньше копии).
+async def find_variant(sha256: str, variant: str) -> str | None:
+    if variant == "original":
+        return None
+    key = variant_key(sha256, variant)
+    return key if await blob_store.exists(key) else None
@@ -0,0 +1,96 @@
+# Бенчмарк метода DatabaseManager.add_pereval: число запросов к базе данных
+# и время добавления перевала в зависимости от количества изображений.
+#
+# Запуск (нужна база данных из .env с применёнными миграциями):
+#     python -m benchmarks.add_pereval --images 0 1 5 10 20 --repeat 20
+#
+# Все изменения выполняются во внешней транзакции, которая откатывается в конце,
+# поэтому данные в базе не остаются. Результат печатается построчно в формате JSON.
+# В "round_trips" входят и SAVEPOINT/RELEASE SAVEPOINT, заменяющие коммит.
+import argparse
+import asyncio
+import base64
+import json
+import os
+import statistics
+import time
+from datetime import datetime
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.database import engine
+from app.db.repositories.pereval import DatabaseManager
+
+
+# Сформировать данные перевала в формате PerevalCreateSchema.model_dump(by_alias=True).
+def make_pereval_data(images_count: int, image_size: int, email: str) -> dict:
+    return {
+        'beauty_title': 'пер. ',
+        'title': 'Бенчмарк',
+        'other_titles': None,
+        'connect': None,
+        'add_time': datetime(2021, 9, 22, 13, 18, 13),
+        'user': {
+            'email': email,
+            'fam': 'Иванов',
+            'name': 'Василий',
+            'otc': 'Иванович',
+            'phone': '+7 555 55 55',
+        },
+        'coords': {'latitude': 45.3842, 'longitude': 7.1525, 'height': 1200},
+        'level': {'winter': None, 'summer': '1А', 'autumn': '1А', 'spring': None},
+        'images': [
+            {'data': base64.b64encode(os.urandom(image_size)).decode('utf-8'), 'title': f'Фото {i}'}
+            for i in range(images_count)
+        ],
+    }
+
+
+async def run(images_counts: list[int], repeat: int, image_size: int) -> None:
+    db_manager = DatabaseManager()
+    statements = 0
+
+    # Считать каждый запрос, отправленный в базу данных.
+    def count_statement(*args):
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count_statement)
+    try:
+        async with engine.connect() as connection:
+            outer = await connection.begin()
+            # Коммиты внутри add_pereval превращаются в точки сохранения внешней транзакции.
+            session = AsyncSession(bind=connection, join_transaction_mode="create_savepoint")
+            for images_count in images_counts:
+                timings = []
+                round_trips = []
+                for i in range(repeat):
+                    data = make_pereval_data(images_count, image_size, f'bench{i}@example.com')
+                    statements = 0
+                    started = time.perf_counter()
+                    await db_manager.add_pereval(session, data)
+                    timings.append((time.perf_counter() - started) * 1000)
+                    round_trips.append(statements)
+                print(json.dumps({
+                    'benchmark': 'add_pereval',
+                    'images': images_count,
+                    'repeat': repeat,
+                    'round_trips': max(round_trips),
+                    'latency_ms_p50': round(statistics.median(timings), 3),
+                    'latency_ms_max': round(max(timings), 3),
+                }))
+            await session.close()
+            await outer.rollback()
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", count_statement)
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Бенчмарк DatabaseManager.add_pereval")
+    parser.add_argument('--images', type=int, nargs='+', default=[0, 1, 5, 10, 20])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--image-size', type=int, default=64 * 1024)
+    args = parser.parse_args()
+    asyncio.run(run(args.images, args.repeat, args.image_size))
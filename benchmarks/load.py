@@ -0,0 +1,160 @@
+# Нагрузочный тест методов /submit_data: пропускная способность и перцентили задержки
+# POST /submit_data, GET /submit_data/{id}, GET /submit_data/?user__email= и PATCH /submit_data/{id}
+# при разном числе одновременных запросов.
+#
+# Запуск против работающего сервера (нужен пакет httpx):
+#     uvicorn main:app --workers 4
+#     python -m benchmarks.load --base-url http://localhost:8000 --concurrency 1 8 32 --requests 500
+#
+# Без --base-url приложение вызывается в том же процессе (без uvicorn и сети).
+# Это удобно для быстрого сравнения коммитов, но клиент и сервер делят один цикл событий.
+#
+# Перед измерениями база данных наполняется тестовыми пользователями, перевалами и изображениями
+# через POST /submit_data/batch. Эти данные не удаляются, поэтому используйте отдельную базу данных.
+# Результат печатается построчно в формате JSON.
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+import uuid
+
+import httpx
+
+from benchmarks.add_pereval import make_pereval_data
+from benchmarks.stats import latency_summary, git_revision
+
+
+ENDPOINTS = ('post', 'get', 'get_email', 'patch')
+
+
+# Сформировать данные перевала в формате JSON для запроса к API.
+def make_pereval_json(images_count: int, image_size: int, email: str) -> dict:
+    data = make_pereval_data(images_count, image_size, email)
+    data['add_time'] = data['add_time'].isoformat(sep=' ')
+    return data
+
+
+# Создать HTTP-клиент: к работающему серверу или к приложению в том же процессе.
+def make_client(base_url: str | None, concurrency: int) -> httpx.AsyncClient:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    if base_url:
+        return httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60)
+    from main import app
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url='http://benchmark', limits=limits, timeout=60
+    )
+
+
+# Наполнить базу данных: пользователи, у каждого несколько перевалов с изображениями.
+# Вернуть список id созданных перевалов и список email пользователей.
+async def seed(
+        client: httpx.AsyncClient,
+        run_id: str,
+        users: int,
+        perevals: int,
+        images: int,
+        image_size: int,
+        batch_size: int,
+) -> tuple[list[int], list[str]]:
+    emails = [f'load-{run_id}-{i}@example.com' for i in range(users)]
+    payload = [make_pereval_json(images, image_size, emails[i % users]) for i in range(perevals)]
+    ids = []
+    for start in range(0, perevals, batch_size):
+        response = await client.post('/submit_data/batch', json=payload[start:start + batch_size])
+        response.raise_for_status()
+        ids.extend(item['id'] for item in response.json()['results'] if item['id'] is not None)
+    return ids, emails
+
+
+# Выполнить "requests" запросов, не более "concurrency" одновременно.
+# Вернуть задержки запросов в миллисекундах, количество ошибок и общее время.
+async def measure(make_request, requests: int, concurrency: int) -> tuple[list[float], int, float]:
+    counter = itertools.count()
+    timings = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while next(counter) < requests:
+            started = time.perf_counter()
+            try:
+                response = await make_request()
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            timings.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return timings, errors, time.perf_counter() - started
+
+
+async def run(args: argparse.Namespace) -> None:
+    rng = random.Random(args.seed)
+    run_id = uuid.uuid4().hex[:8]
+    revision = git_revision()
+
+    async with make_client(args.base_url, max(args.concurrency)) as client:
+        seeding_started = time.perf_counter()
+        ids, emails = await seed(
+            client, run_id, args.users, args.perevals, args.images, args.image_size, args.batch_size
+        )
+        print(json.dumps({
+            'benchmark': 'load_seed',
+            'revision': revision,
+            'users': args.users,
+            'perevals': len(ids),
+            'images_per_pereval': args.images,
+            'duration_s': round(time.perf_counter() - seeding_started, 3),
+        }))
+        if not ids:
+            raise SystemExit('Не удалось наполнить базу данных тестовыми перевалами')
+
+        # Запросы к каждому методу. Перевалы и пользователи выбираются случайно из созданных при наполнении.
+        new_pereval = make_pereval_json(args.images, args.image_size, emails[0])
+        requests = {
+            'post': lambda: client.post('/submit_data', json=new_pereval),
+            'get': lambda: client.get(
+                f'/submit_data/{rng.choice(ids)}', params={'image_format': args.image_format}
+            ),
+            'get_email': lambda: client.get(
+                '/submit_data/', params={'user__email': rng.choice(emails), 'image_format': args.image_format}
+            ),
+            'patch': lambda: client.patch(
+                f'/submit_data/{rng.choice(ids)}', json={'title': f'Бенчмарк {rng.randrange(10 ** 6)}'}
+            ),
+        }
+
+        for endpoint in args.endpoints:
+            for concurrency in args.concurrency:
+                timings, errors, duration = await measure(requests[endpoint], args.requests, concurrency)
+                print(json.dumps({
+                    'benchmark': 'load',
+                    'revision': revision,
+                    'endpoint': endpoint,
+                    'concurrency': concurrency,
+                    'requests': len(timings),
+                    'errors': errors,
+                    'duration_s': round(duration, 3),
+                    'throughput_rps': round(len(timings) / duration, 1) if duration else None,
+                    **latency_summary(timings),
+                }))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Нагрузочный тест методов /submit_data")
+    parser.add_argument('--base-url', default=None, help="Адрес сервера. Без него приложение вызывается в процессе")
+    parser.add_argument('--endpoints', nargs='+', choices=ENDPOINTS, default=list(ENDPOINTS))
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--requests', type=int, default=200, help="Количество запросов на каждый замер")
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--perevals', type=int, default=200)
+    parser.add_argument('--images', type=int, default=2, help="Количество изображений у каждого перевала")
+    parser.add_argument('--image-size', type=int, default=16 * 1024)
+    parser.add_argument('--image-format', choices=['data', 'url'], default='url')
+    parser.add_argument('--batch-size', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,115 @@
+# Микробенчмарки без базы данных: валидация и сериализация Pydantic-схем перевала
+# и кодирование/декодирование изображений в base64 функциями приложения (encode_image, decode_image).
+# Размеры изображений для base64 по умолчанию берутся меньше и больше OFFLOAD_THRESHOLD,
+# чтобы сравнить кодирование в цикле событий и в пуле потоков.
+#
+# Запуск:
+#     python -m benchmarks.micro --images 0 5 20 --image-size 65536 --codec-sizes 16384 262144 --repeat 200
+#
+# Результат печатается построчно в формате JSON (время одной операции в микросекундах).
+import argparse
+import asyncio
+import base64
+import json
+import os
+import statistics
+import time
+
+from app.api.schemas.pereval import PerevalCreateSchema, PerevalReadSchema
+from app.storage.image_codec import OFFLOAD_THRESHOLD, decode_image, encode_image
+from benchmarks.add_pereval import make_pereval_data
+from benchmarks.stats import git_revision
+
+
+# Измерить время одной операции: несколько прогонов по "number" вызовов, медиана и минимум.
+def timeit(func, repeat: int, number: int = 10) -> dict:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - started) / number * 1_000_000)
+    return {
+        'op_us_p50': round(statistics.median(timings), 3),
+        'op_us_min': round(min(timings), 3),
+    }
+
+
+# То же для асинхронной функции: все прогоны выполняются в одном цикле событий.
+def atimeit(func, repeat: int, number: int = 10) -> dict:
+    async def measure() -> list[float]:
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for _ in range(number):
+                await func()
+            timings.append((time.perf_counter() - started) / number * 1_000_000)
+        return timings
+
+    timings = asyncio.run(measure())
+    return {
+        'op_us_p50': round(statistics.median(timings), 3),
+        'op_us_min': round(min(timings), 3),
+    }
+
+
+# Сформировать данные для PerevalReadSchema из данных создания перевала.
+def make_read_data(data: dict) -> dict:
+    level = data['level']
+    return {
+        'status': 1,
+        **{key: data[key] for key in ('beauty_title', 'title', 'other_titles', 'connect', 'add_time')},
+        'user': data['user'],
+        'coords': data['coords'],
+        **{f'level_{season}': value for season, value in level.items()},
+        'images': data['images'],
+    }
+
+
+def run(images_counts: list[int], image_size: int, codec_sizes: list[int], repeat: int) -> None:
+    revision = git_revision()
+
+    def report(name: str, result: dict, **params) -> None:
+        print(json.dumps({'benchmark': 'micro', 'revision': revision, 'name': name, **params, **result}))
+
+    # Pydantic-схемы: разбор входного JSON, словаря и сериализация ответа.
+    for images_count in images_counts:
+        data = make_pereval_data(images_count, image_size, 'micro@example.com')
+        raw = json.dumps({**data, 'add_time': data['add_time'].isoformat()})
+        pereval = PerevalCreateSchema.model_validate(data)
+        read = PerevalReadSchema.model_validate(make_read_data(data))
+        params = {'images': images_count, 'image_size': image_size}
+
+        report('create_validate_json', timeit(lambda: PerevalCreateSchema.model_validate_json(raw), repeat), **params)
+        report('create_validate_dict', timeit(lambda: PerevalCreateSchema.model_validate(data), repeat), **params)
+        report('create_dump', timeit(lambda: pereval.model_dump(by_alias=True), repeat), **params)
+        report('read_dump_json', timeit(read.model_dump_json, repeat), **params)
+        report('read_dump_json_stdlib', timeit(lambda: json.dumps(read.model_dump(mode='json')), repeat), **params)
+
+    # Кодирование изображений в base64 (GET с image_format=data) и декодирование (POST и PATCH).
+    # "offloaded" - выполнялась ли операция в пуле потоков (данные длиннее OFFLOAD_THRESHOLD).
+    for size in codec_sizes:
+        content = os.urandom(size)
+        encoded = base64.b64encode(content).decode('utf-8')
+        report(
+            'encode_image',
+            atimeit(lambda: encode_image(content), repeat),
+            image_size=size,
+            offloaded=size > OFFLOAD_THRESHOLD
+        )
+        report(
+            'decode_image',
+            atimeit(lambda: decode_image(encoded), repeat),
+            image_size=size,
+            offloaded=len(encoded) > OFFLOAD_THRESHOLD
+        )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Микробенчмарки Pydantic-схем и base64")
+    parser.add_argument('--images', type=int, nargs='+', default=[0, 5, 20])
+    parser.add_argument('--image-size', type=int, default=64 * 1024)
+    parser.add_argument('--codec-sizes', type=int, nargs='+', default=[OFFLOAD_THRESHOLD // 4, OFFLOAD_THRESHOLD * 4])
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+    run(args.images, args.image_size, args.codec_sizes, args.repeat)
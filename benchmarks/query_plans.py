@@ -0,0 +1,211 @@
+# Проверка планов запросов DatabaseManager: ни один запрос не должен читать
+# большие таблицы целиком.
+#
+# Запуск (нужна база данных из .env с применёнными миграциями):
+#     python -m benchmarks.query_plans --users 2000 --perevals 50000 --images 50000 --jobs 50000
+#
+# Скрипт наполняет базу тестовыми данными, собирает по ним статистику (ANALYZE), выполняет
+# методы DatabaseManager, перехватывает отправленные ими SELECT/UPDATE/DELETE и строит
+# для каждого план через EXPLAIN с обычными настройками планировщика.
+# Полным чтением таблицы считается последовательное сканирование (Seq Scan), а также обход
+# индекса без условия по нему (Index Scan / Index Only Scan без "Index Cond"), когда строки
+# отбираются только фильтром - например, обход первичного ключа ради ORDER BY id.
+# Все изменения выполняются во внешней транзакции, которая откатывается в конце.
+# Результат печатается построчно в формате JSON, при найденных полных чтениях код возврата - 1.
+import argparse
+import asyncio
+import json
+import sys
+from datetime import datetime
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.database import engine
+from app.db.models import StatusPereval, StatusJob
+from app.db.repositories.pereval import DatabaseManager
+
+
+# Таблицы, которые растут вместе с количеством перевалов.
+LARGE_TABLES = {"users", "coords", "pereval_added", "p_images", "pereval_images", "jobs"}
+
+# Узлы плана, читающие строки таблицы по индексу.
+INDEX_SCANS = {"Index Scan", "Index Only Scan"}
+
+# Количество подобластей тестовой области, по которым распределяются перевалы.
+AREA_CHILDREN = 20
+
+# Начало запросов, планы которых проверяются.
+CHECKED_STATEMENTS = ("SELECT", "UPDATE", "DELETE")
+
+
+# Наполнить базу тестовыми областями, пользователями, перевалами, изображениями и задачами.
+# Возвращает id корневой тестовой области.
+async def seed(connection, users: int, perevals: int, images: int, jobs: int) -> int:
+    # Корневая область и её подобласти с id после существующих (таблицу замыкания заполняет триггер).
+    area_id = (await connection.execute(text("SELECT coalesce(max(id), 0) + 1 FROM pereval_areas"))).scalar_one()
+    await connection.execute(text(
+        "INSERT INTO pereval_areas (id, id_parent, title) "
+        "SELECT :root + g, CASE WHEN g = 0 THEN 0 ELSE :root END, 'plan-check ' || g "
+        "FROM generate_series(0, :children) g"
+    ), {"root": area_id, "children": AREA_CHILDREN})
+    await connection.execute(text(
+        "INSERT INTO users (email, phone, fam, name) "
+        "SELECT 'plan-check-' || g || '@example.com', '+7 555 55 55', 'Иванов', 'Василий' "
+        "FROM generate_series(1, :users) g"
+    ), {"users": users})
+    await connection.execute(text(
+        "WITH u AS (SELECT min(id) AS first_id FROM users WHERE email LIKE 'plan-check-%'), "
+        "c AS ("
+        "  INSERT INTO coords (latitude, longitude, height) "
+        "  SELECT random() * 170 - 85, random() * 360 - 180, (random() * 7000)::int "
+        "  FROM generate_series(1, :perevals) RETURNING id"
+        ") "
+        "INSERT INTO pereval_added (beauty_title, title, add_time, creator_id, coord_id, status, area_id) "
+        "SELECT 'пер. ', 'plan-check ' || c.id, NOW() - c.id * interval '1 minute', "
+        "       u.first_id + c.id % :users, c.id, 1 + c.id % 4, :root + 1 + c.id % :children "
+        "FROM c, u"
+    ), {"users": users, "perevals": perevals, "root": area_id, "children": AREA_CHILDREN})
+    await connection.execute(text(
+        "WITH p AS (SELECT min(id) AS first_id, count(*) AS total FROM pereval_added WHERE title LIKE 'plan-check %'), "
+        "i AS ("
+        "  INSERT INTO p_images (title, sha256, size, mime_type) "
+        "  SELECT 'Фото', md5(g::text) || md5(g::text), 1024, 'image/jpeg' "
+        "  FROM generate_series(1, :images) g RETURNING id"
+        ") "
+        "INSERT INTO pereval_images (pereval_id, image_id) "
+        "SELECT p.first_id + i.id % p.total, i.id FROM i, p"
+    ), {"images": images})
+    # Задачи: в основном выполненные за последние дни, каждая десятая ещё в очереди.
+    await connection.execute(text(
+        "INSERT INTO jobs (kind, payload, status, attempts, run_after, created_at) "
+        "SELECT 'pereval_submitted', jsonb_build_object('pereval_id', g), "
+        "       CASE WHEN g % 10 = 0 THEN CAST(:queued AS integer) ELSE CAST(:done AS integer) END, 1, "
+        "       NOW() - g * interval '10 seconds', NOW() - g * interval '10 seconds' "
+        "FROM generate_series(1, :jobs) g"
+    ), {"jobs": jobs, "queued": StatusJob.QUEUED.value, "done": StatusJob.DONE.value})
+    await connection.execute(text("ANALYZE"))
+    return area_id
+
+
+# Сформировать данные перевала в формате PerevalCreateSchema.model_dump(by_alias=True).
+def make_pereval_data(email: str) -> dict:
+    return {
+        'beauty_title': 'пер. ',
+        'title': 'plan-check new',
+        'other_titles': None,
+        'connect': None,
+        'add_time': datetime(2021, 9, 22, 13, 18, 13),
+        'user': {'email': email, 'fam': 'Иванов', 'name': 'Василий', 'otc': None, 'phone': '+7 555 55 55'},
+        'coords': {'latitude': 45.3842, 'longitude': 7.1525, 'height': 1200},
+        'level': {'winter': None, 'summer': '1А', 'autumn': None, 'spring': None},
+        'images': [],
+    }
+
+
+# Найти в плане узлы, читающие большие таблицы целиком: последовательное сканирование
+# и обход индекса без условия по нему.
+def find_full_scans(plan: dict) -> list[str]:
+    found = []
+    if plan.get("Relation Name") in LARGE_TABLES:
+        if plan.get("Node Type") == "Seq Scan":
+            found.append(f"Seq Scan on {plan['Relation Name']}")
+        elif plan.get("Node Type") in INDEX_SCANS and "Index Cond" not in plan:
+            found.append(f"{plan['Node Type']} using {plan['Index Name']} on {plan['Relation Name']}")
+    for child in plan.get("Plans", []):
+        found.extend(find_full_scans(child))
+    return found
+
+
+# Прочитать перевалы пользователя курсором до конца.
+async def consume_perevals_of_user(db_manager: DatabaseManager, session: AsyncSession, user, limit: int) -> None:
+    async for _ in db_manager.stream_perevals_of_user(session, user, limit=limit):
+        pass
+
+
+async def run(users: int, perevals: int, images: int, jobs: int) -> int:
+    db_manager = DatabaseManager()
+    failed = 0
+    async with engine.connect() as connection:
+        outer = await connection.begin()
+        area_id = await seed(connection, users, perevals, images, jobs)
+        pereval_id = (await connection.execute(text(
+            "SELECT id FROM pereval_added WHERE title LIKE 'plan-check %' AND status = 1 ORDER BY id LIMIT 1"
+        ))).scalar_one()
+        image_id = (await connection.execute(text(
+            "SELECT image_id FROM pereval_images WHERE pereval_id = :id LIMIT 1"
+        ), {"id": pereval_id})).scalar()
+        email = 'plan-check-1@example.com'
+
+        # Коммиты внутри методов превращаются в точки сохранения внешней транзакции.
+        session = AsyncSession(bind=connection, join_transaction_mode="create_savepoint")
+        user = await db_manager.get_user_on_email(session, email)
+        checks = {
+            "add_pereval": lambda: db_manager.add_pereval(session, make_pereval_data(email)),
+            "get_pereval_on_id": lambda: db_manager.get_pereval_on_id(session, pereval_id),
+            "get_pereval_version": lambda: db_manager.get_pereval_version(session, pereval_id),
+            "get_user_on_email": lambda: db_manager.get_user_on_email(session, email),
+            "get_perevals_on_email": lambda: db_manager.get_perevals_on_email(session, email, limit=20),
+            "get_perevals_version_on_email": lambda: db_manager.get_perevals_version_on_email(session, email),
+            "get_image_on_id": lambda: db_manager.get_image_on_id(session, image_id),
+            "search_perevals_in_bbox": lambda: db_manager.search_perevals_in_bbox(session, 45, 7, 46, 8, 100),
+            "search_perevals_near": lambda: db_manager.search_perevals_near(session, 45.5, 7.5, 25, 100),
+            "search_perevals_by_text": lambda: db_manager.search_perevals_by_text(session, 'plan-chek 1', 21),
+            "count_perevals_by_area": lambda: db_manager.count_perevals_by_area(session),
+            "stream_perevals_of_user": lambda: consume_perevals_of_user(db_manager, session, user, 20),
+            "get_perevals_in_area": lambda: db_manager.get_perevals_in_area(session, area_id, 101),
+            "get_pereval_changes": lambda: db_manager.get_pereval_changes(session, None, (0, 0), 100),
+            "patch_pereval_on_id": lambda: db_manager.patch_pereval_on_id(
+                session, pereval_id, {'title': 'plan-check patched', 'images': []}
+            ),
+            "claim_perevals_for_moderation": lambda: db_manager.claim_perevals_for_moderation(session, 10),
+            "set_perevals_status": lambda: db_manager.set_perevals_status(
+                session, [pereval_id], (StatusPereval.PENDING,), StatusPereval.ACCEPTED
+            ),
+            "claim_jobs": lambda: db_manager.claim_jobs(session, 10, 600),
+            "delete_finished_jobs": lambda: db_manager.delete_finished_jobs(session, 86400),
+        }
+
+        for name, check in checks.items():
+            statements = []
+
+            # Сохранить проверяемые запросы метода вместе с параметрами.
+            def capture(conn, cursor, statement, parameters, context, executemany):
+                if statement.lstrip().upper().startswith(CHECKED_STATEMENTS) and not executemany:
+                    statements.append((statement, parameters))
+
+            event.listen(engine.sync_engine, "before_cursor_execute", capture)
+            try:
+                await check()
+            finally:
+                event.remove(engine.sync_engine, "before_cursor_execute", capture)
+            session.expunge_all()
+
+            for statement, parameters in statements:
+                explain = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+                plan = explain.scalar_one()
+                plan = json.loads(plan) if isinstance(plan, str) else plan
+                full_scans = find_full_scans(plan[0]["Plan"])
+                failed += bool(full_scans)
+                print(json.dumps({
+                    'check': 'query_plan',
+                    'method': name,
+                    'statement': " ".join(statement.split())[:200],
+                    'full_scans': full_scans,
+                    'ok': not full_scans,
+                }, ensure_ascii=False))
+
+        await session.close()
+        await outer.rollback()
+    await engine.dispose()
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Проверка планов запросов DatabaseManager")
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--perevals', type=int, default=50000)
+    parser.add_argument('--images', type=int, default=50000)
+    parser.add_argument('--jobs', type=int, default=50000)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.users, args.perevals, args.images, args.jobs)))
@@ -0,0 +1,27 @@
+import statistics
+import subprocess
+
+
+# Вычислить перцентили задержек (в миллисекундах) для вывода результата бенчмарка.
+def latency_summary(timings: list[float]) -> dict:
+    if len(timings) > 1:
+        quantiles = statistics.quantiles(timings, n=100, method='inclusive')
+        p50, p95, p99 = quantiles[49], quantiles[94], quantiles[98]
+    else:
+        p50 = p95 = p99 = timings[0] if timings else 0.0
+    return {
+        'latency_ms_p50': round(p50, 3),
+        'latency_ms_p95': round(p95, 3),
+        'latency_ms_p99': round(p99, 3),
+        'latency_ms_max': round(max(timings, default=0.0), 3),
+    }
+
+
+# Получить текущий коммит, чтобы результаты разных запусков можно было сравнивать между собой.
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
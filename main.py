@@ -1,7 +1,32 @@
 from fastapi import FastAPI
+from app.api.middleware import MetricsMiddleware, QueryCountingMiddleware
+from app.core.config import settings
 from app.api.endpoints.pereval import router as pereval_router
+from app.api.endpoints.images import router as images_router
+from app.api.endpoints.search import router as search_router
+from app.api.endpoints.metrics import router as metrics_router
+from app.api.endpoints.moderation import router as moderation_router
+from app.api.endpoints.areas import router as areas_router
+from app.api.endpoints.reference import router as reference_router
 
 # Создать приложение
 app = FastAPI()
+# Собирать метрики HTTP-запросов для GET /metrics
+app.add_middleware(MetricsMiddleware)
+# Считать запросы к базе данных в каждом HTTP-запросе, если это включено в настройках
+if settings.SQL_INSTRUMENTATION:
+    app.add_middleware(QueryCountingMiddleware)
 # Подключить к приложению пути, обрабатывающие запросы о перевалах
 app.include_router(pereval_router)
+# Подключить к приложению пути, отдающие изображения перевалов
+app.include_router(images_router)
+# Подключить к приложению пути поиска перевалов
+app.include_router(search_router)
+# Подключить к приложению пути с метриками сервиса
+app.include_router(metrics_router)
+# Подключить к приложению пути модерации перевалов
+app.include_router(moderation_router)
+# Подключить к приложению пути дерева областей перевалов
+app.include_router(areas_router)
+# Подключить к приложению пути справочников
+app.include_router(reference_router)